@@ -1,2 +1,4 @@
 from .app_settings import app_settings
 from .swagger import settings as swagger_settings
+from .tracing_settings import tracing_settings
+from .logging_settings import logging_settings
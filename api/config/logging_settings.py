@@ -0,0 +1,25 @@
+"""Configuration for application logging."""
+
+from pydantic_settings import BaseSettings
+
+
+class LoggingSettings(BaseSettings):
+    """Settings that control structured logging."""
+
+    level: str = "INFO"
+    # Per-logger overrides, e.g. "api.services.auth=DEBUG,kubernetes=WARNING"
+    levels: str = ""
+    # Emit JSON lines; False falls back to plain text for local debugging
+    json_format: bool = True
+    # Fraction of DEBUG/INFO records kept; warnings and errors are never sampled
+    sample_ratio: float = 1.0
+    queue_size: int = 10000
+
+    model_config = {
+        "env_file": ".env",
+        "env_prefix": "LOG_",
+        "extra": "allow",
+    }
+
+
+logging_settings = LoggingSettings()
@@ -1,5 +1,8 @@
 """Configuration for Rexec server provisioning."""
 
+from functools import cached_property
+from typing import List
+
 from pydantic_settings import BaseSettings
 
 
@@ -10,6 +13,9 @@ class RexecSettings(BaseSettings):
     kubeconfig_mount_path: str | None = "/code/env_variables/.kubeconfig"
     use_in_cluster_config: bool = False
     namespace_prefix: str = "rexec-server-"
+    namespace_mode: str = "per-user"
+    shared_namespace_count: int = 8
+    network_policy_manifest_name: str = "rexec-server-networkpolicy.yaml"
     namespace_wait_timeout_seconds: int = 60
     broker_service_name: str = "rexec-broker-internal-ip"
     broker_namespace: str = "rexec-broker"
@@ -19,6 +25,32 @@ class RexecSettings(BaseSettings):
     broker_external_port: int | None = None
     container_name: str = "rexec-server"
     deployment_manifest_name: str = "rexec-server-deployment.yaml"
+    supported_python_versions: str = "3.10,3.11,3.12"
+    reject_unsupported_python_versions: bool = True
+    image_prepull_enabled: bool = True
+    image_prepull_namespace: str = "rexec-image-prepull"
+    image_prepull_manifest_name: str = "rexec-image-prepull-daemonset.yaml"
+    server_code_source: str = "git"
+    server_code_path: str | None = None
+    server_code_version: str | None = None
+    server_code_repository: str = "https://github.com/sci-ndp/SciDx-rexec-server.git"
+    server_code_mount_path: str = "/opt/rexec-server"
+    state_store_path: str = "rexec-state.sqlite3"
+    state_reconcile_interval_seconds: int = 60
+    resume_interrupted_provisioning: bool = True
+    resolver_enabled: bool = True
+    resolver_index_url: str | None = None
+    resolver_timeout_seconds: int = 120
+    resolver_failure_cache_seconds: int = 600
+    crashloop_watch_enabled: bool = True
+    crashloop_failure_threshold: int = 3
+    crashloop_log_tail_lines: int = 50
+    leader_election_enabled: bool = False
+    leader_election_namespace: str = "default"
+    # Defaults to one Lease per host: the state store is a local file, so
+    # replicas must not share a leader
+    leader_election_lease_name: str | None = None
+    leader_election_lease_duration_seconds: int = 15
 
     model_config = {
         "env_file": ".env",
@@ -26,5 +58,15 @@ class RexecSettings(BaseSettings):
         "extra": "allow"
     }
 
+    @cached_property
+    def python_versions(self) -> List[str]:
+        """The configured supported Python versions, parsed once."""
+        versions: List[str] = []
+        for version in self.supported_python_versions.split(","):
+            cleaned = version.strip()
+            if cleaned and cleaned not in versions:
+                versions.append(cleaned)
+        return versions
+
 
 rexec_settings = RexecSettings()
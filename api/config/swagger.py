@@ -1,3 +1,6 @@
+from functools import cached_property
+from typing import FrozenSet
+
 from pydantic_settings import BaseSettings
 
 
@@ -14,4 +17,17 @@ class SwaggerSettings(BaseSettings):
         "extra": "allow",
     }
 
+    @cached_property
+    def allowed_groups(self) -> FrozenSet[str]:
+        """Allowed groups in lowercase without leading slashes, parsed once."""
+        return frozenset(
+            cleaned
+            for cleaned in (
+                group.strip().lower().lstrip("/")
+                for group in self.group_names.split(",")
+            )
+            if cleaned
+        )
+
+
 settings = SwaggerSettings()
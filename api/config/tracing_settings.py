@@ -0,0 +1,30 @@
+"""Configuration for per-request phase tracing."""
+
+from pydantic_settings import BaseSettings
+
+
+class TracingSettings(BaseSettings):
+    """Settings that control request tracing and span export."""
+
+    enabled: bool = True
+    # "jsonl", "otlp" or "none"
+    exporter: str = "none"
+    jsonl_path: str = "rexec-traces.jsonl"
+    # The file is rolled over to "<path>.1" once it grows past this size
+    jsonl_max_bytes: int = 10 * 1024 * 1024
+    otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    otlp_timeout_seconds: float = 5.0
+    service_name: str = "rexec-deployment-api"
+    # Fraction of ordinary requests exported; slow and failed ones always are
+    sample_ratio: float = 0.1
+    slow_request_threshold_ms: float = 5000.0
+    server_timing_enabled: bool = True
+
+    model_config = {
+        "env_file": ".env",
+        "env_prefix": "TRACING_",
+        "extra": "allow",
+    }
+
+
+tracing_settings = TracingSettings()
@@ -1,9 +1,28 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 import api.routes as routes
-from .config import app_settings, swagger_settings
+from .config import app_settings, swagger_settings, tracing_settings
+from .services import rexec_services, tracing
+from .services.structured_logging import configure_logging
+
+# Route application logs through the non-blocking, redacting log handler
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Refuse to start with server code that no spawn could use
+    rexec_services.check_server_code()
+    # Start cluster-side housekeeping (image pre-pull, state reconciliation)
+    # without blocking startup
+    rexec_services.start_background_tasks()
+    yield
+    rexec_services.stop_background_tasks()
+
 
 # Create a FastAPI app instance with custom Swagger UI settings
 app = FastAPI(
@@ -11,6 +30,7 @@ app = FastAPI(
     description=swagger_settings.swagger_description,
     version=swagger_settings.swagger_version,
     root_path=app_settings.root_path or "",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware to allow cross-origin requests from any origin
@@ -22,6 +42,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Trace request phases; slow requests are always exported
+if tracing_settings.enabled:
+    @app.middleware("http")
+    async def trace_requests(request: Request, call_next):
+        with tracing.start_trace(
+            f"{request.method} {request.url.path}",
+            http_method=request.method,
+            http_path=request.url.path,
+        ) as trace:
+            response = await call_next(request)
+            trace.root.attributes["http_status"] = response.status_code
+        if tracing_settings.server_timing_enabled:
+            response.headers["Server-Timing"] = trace.server_timing()
+        return response
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -3,8 +3,10 @@
 from fastapi import APIRouter
 from .post_rexec import router as post_rexec_router
 from .get_rexec_config import router as get_rexec_config_router
+from .get_rexec_status import router as get_rexec_status_router
 
 router = APIRouter()
 
 router.include_router(post_rexec_router)
 router.include_router(get_rexec_config_router)
+router.include_router(get_rexec_status_router)
@@ -0,0 +1,60 @@
+"""
+Report the state of the caller's Rexec servers.
+"""
+
+from typing import Annotated
+
+from fastapi import APIRouter, Header, HTTPException, status
+
+from api.services import rexec_services
+from api.services.auth import require_group_membership, validate_token
+
+router = APIRouter()
+
+
+@router.get(
+    "/status",
+    summary="Get Rexec Server Status",
+    description=(
+        "List the caller's Rexec servers with their provisioning phase and, for "
+        "servers stopped after repeated failures, the reason and container log tail."
+    ),
+)
+def get_rexec_server_status(
+    authorization: Annotated[str,
+        Header(
+            title="Authorization",
+            description="Bearer token identifying the user",
+        )
+    ],
+):
+    """
+    Return the recorded Rexec servers for the authenticated user.
+    """
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authorization header must use the Bearer scheme.",
+        )
+
+    user_info = validate_token(token.strip())
+    require_group_membership(user_info)
+
+    resolved_user_id = str(user_info.get("sub") or "").strip()
+    if not resolved_user_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User id could not be resolved from token.",
+        )
+
+    try:
+        return {
+            "Username": str(user_info.get("username")).strip(),
+            "Servers": rexec_services.get_rexec_server_status(resolved_user_id),
+        }
+    except Exception as exc:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve Rexec server status: {exc}",
+        )
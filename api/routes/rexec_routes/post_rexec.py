@@ -2,6 +2,7 @@
 Register route for provisioning user Rexec server.
 """
 
+import logging
 from typing import Annotated
 
 from fastapi import APIRouter, HTTPException, Form, status
@@ -9,6 +10,8 @@ from fastapi import APIRouter, HTTPException, Form, status
 from api.services import rexec_services
 from api.services.auth import require_group_membership, validate_token
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -26,6 +29,12 @@ def create_rexec_server(
             description="Bearer token for validating group membership"
         )
     ],
+    retry: Annotated[bool,
+        Form(
+            title="Retry",
+            description="Restart a server that was stopped after repeated failures",
+        )
+    ] = False,
 ):
     """
     Create a new rexec server for a user in a unique namespace.
@@ -43,12 +52,31 @@ def create_rexec_server(
     group_id = matched_group
     username = str(user_info.get('username')).strip()
     try:
-        msg = rexec_services.create_rexec_server_resources(group_id, resolved_user_id, requirments)
+        msg = rexec_services.create_rexec_server_resources(
+            group_id,
+            resolved_user_id,
+            requirments,
+            retry_stopped=retry,
+        )
         return {
             "Status": msg,
             "Username": username,
             "NDP_Endpoint_membership": group_id,
         }
+    except rexec_services.RexecServerStoppedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": str(e),
+                "reason": e.reason,
+                "log_tail": e.log_tail,
+            },
+        )
+    except rexec_services.RexecValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        )
     except Exception as e:
-        print(type(e), e)
+        logger.exception("Failed to provision Rexec server", extra={"user": resolved_user_id})
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -2,25 +2,19 @@
 Helper utilities for validating tokens and enforcing group membership.
 """
 
-from typing import Any, Dict, List, Optional
+import logging
+from typing import Any, Dict, Optional
 
 import requests
 from fastapi import HTTPException, status
 
 from api.config.swagger import settings as swagger_settings
+from api.services.tracing import traced
 
-
-def get_allowed_groups() -> List[str]:
-    """Return configured allowed groups in lowercase without leading slashes."""
-    print(f"Configured allowed groups: {swagger_settings.group_names}")
-    allowed: List[str] = []
-    for group in swagger_settings.group_names.split(","):
-        cleaned = group.strip().lower().lstrip("/")
-        if cleaned:
-            allowed.append(cleaned)
-    return allowed
+logger = logging.getLogger(__name__)
 
 
+@traced("auth.validate_token")
 def validate_token(token: str) -> Dict[str, Any]:
     """Validate the provided token via the configured auth service."""
     if not token:
@@ -28,7 +22,6 @@ def validate_token(token: str) -> Dict[str, Any]:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token is required.",
         )
-    print(f"Received token: {token}")
     try:
         response = requests.post(
             swagger_settings.auth_api_url,
@@ -66,7 +59,6 @@ def validate_token(token: str) -> Dict[str, Any]:
         )
 
     data = response.json()
-    print(f"Token validation response data: {data}")
     if "error" in data:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -74,9 +66,11 @@ def validate_token(token: str) -> Dict[str, Any]:
         )
     if "sub" not in data:
         data["sub"] = "unknown"
+    logger.debug("Token validated", extra={"user": data["sub"]})
     return data
 
 
+@traced("auth.require_group_membership")
 def require_group_membership(user_info: Dict[str, Any]) -> Optional[str]:
     """
     Enforce allowed group membership when the feature is enabled.
@@ -87,7 +81,7 @@ def require_group_membership(user_info: Dict[str, Any]) -> Optional[str]:
     if not swagger_settings.enable_group_based_access:
         return None
 
-    allowed_groups = get_allowed_groups()
+    allowed_groups = swagger_settings.allowed_groups
     if not allowed_groups:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -95,7 +89,10 @@ def require_group_membership(user_info: Dict[str, Any]) -> Optional[str]:
         )
 
     user_groups = user_info.get("groups", [])
-    print(f"User {user_info.get('sub', 'unknown')} groups membership: {user_groups}")
+    logger.debug(
+        "Checking group membership",
+        extra={"user": user_info.get("sub", "unknown"), "groups": user_groups},
+    )
     for group in user_groups:
         if isinstance(group, str):
             group_value = group.lower().lstrip("/")
@@ -2,7 +2,28 @@
 High-level entry points for Rexec service orchestration.
 """
 
-from .create_rexec_server_resources import create_rexec_server_resources, get_rexec_broker_config
+from .background import start_background_tasks, stop_background_tasks
+from .create_rexec_server_resources import (
+    RexecResolutionError,
+    RexecServerStoppedError,
+    RexecValidationError,
+    check_server_code,
+    create_rexec_server_resources,
+    get_rexec_broker_config,
+    get_rexec_server_status,
+)
+from .image_prepull import ensure_image_prepull
 
 # Expose the service functions used by the Rexec routes
-__all__ = ["create_rexec_server_resources", "get_rexec_broker_config"]
+__all__ = [
+    "RexecResolutionError",
+    "RexecServerStoppedError",
+    "RexecValidationError",
+    "check_server_code",
+    "create_rexec_server_resources",
+    "ensure_image_prepull",
+    "get_rexec_broker_config",
+    "get_rexec_server_status",
+    "start_background_tasks",
+    "stop_background_tasks",
+]
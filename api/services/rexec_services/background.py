@@ -0,0 +1,161 @@
+"""
+Background tasks started alongside the API process.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import List
+
+from api.config.rexec_settings import RexecSettings, rexec_settings
+
+from .crashloop_watcher import watch_crashloops
+from .image_prepull import ensure_image_prepull
+from .leader_election import run_leader_election
+from .state_reconciler import reconcile_state, resume_interrupted_provisioning
+
+logger = logging.getLogger(__name__)
+
+# Set when the API process shuts down
+_stop_event = threading.Event()
+_election_thread: threading.Thread | None = None
+
+# The controllers run for one leadership term; each term gets a fresh event so
+# a controller still winding down from the last term never sees it cleared
+_controller_threads: List[threading.Thread] = []
+_controller_stop_event = threading.Event()
+_controllers_lock = threading.Lock()
+
+
+def _run_image_prepull(settings: RexecSettings, stop_event: threading.Event) -> None:
+    """Apply the pre-pull DaemonSet, reporting failures without crashing the API."""
+    try:
+        if ensure_image_prepull(settings=settings):
+            logger.info(
+                "Image pre-pull DaemonSet applied for Python versions: %s",
+                ", ".join(settings.python_versions),
+            )
+    except Exception as exc:  # noqa: BLE001 - never take the API down on startup
+        logger.error("Failed to apply image pre-pull DaemonSet: %s", exc)
+
+
+def _run_state_reconciler(settings: RexecSettings, stop_event: threading.Event) -> None:
+    """
+    Periodically resume provisioning left behind by exited workers and
+    reconcile the state store with the cluster.
+    """
+    while not stop_event.is_set():
+        if settings.resume_interrupted_provisioning:
+            try:
+                resumed = resume_interrupted_provisioning(settings=settings)
+                if resumed:
+                    logger.info("Resumed %d interrupted Rexec provisioning job(s)", resumed)
+            except Exception as exc:  # noqa: BLE001 - keep the reconciler running
+                logger.error("Failed to resume interrupted provisioning: %s", exc)
+        try:
+            reconcile_state(settings=settings)
+        except Exception as exc:  # noqa: BLE001 - retry on the next interval
+            logger.error("Failed to reconcile Rexec provisioning state: %s", exc)
+        stop_event.wait(settings.state_reconcile_interval_seconds)
+
+
+def _run_crashloop_watcher(settings: RexecSettings, stop_event: threading.Event) -> None:
+    """Stop Rexec servers stuck in back-off and record why."""
+    watch_crashloops(stop_event, settings=settings)
+
+
+def _start_thread(
+    target,
+    settings: RexecSettings,
+    stop_event: threading.Event,
+    name: str,
+) -> None:
+    thread = threading.Thread(
+        target=target,
+        args=(settings, stop_event),
+        name=name,
+        daemon=True,
+    )
+    thread.start()
+    _controller_threads.append(thread)
+
+
+def _join_controllers(timeout: float) -> None:
+    """Wait for stopped controllers, keeping any that are still running."""
+    for thread in _controller_threads:
+        thread.join(timeout)
+    _controller_threads[:] = [thread for thread in _controller_threads if thread.is_alive()]
+
+
+def _start_controllers(settings: RexecSettings, timeout: float = 5.0) -> None:
+    """
+    Start the controllers that act on the cluster for the whole API, once the
+    previous term's controllers have exited.
+    """
+    global _controller_stop_event
+    with _controllers_lock:
+        _join_controllers(timeout)
+        if _controller_threads:
+            # A stopped controller never acts again, but must not be doubled
+            raise RuntimeError(
+                "Controllers from the previous leadership term are still running: "
+                + ", ".join(thread.name for thread in _controller_threads)
+            )
+        _controller_stop_event = threading.Event()
+        stop_event = _controller_stop_event
+        _start_thread(_run_image_prepull, settings, stop_event, "rexec-image-prepull")
+        _start_thread(_run_state_reconciler, settings, stop_event, "rexec-state-reconciler")
+        if settings.crashloop_watch_enabled:
+            _start_thread(
+                _run_crashloop_watcher,
+                settings,
+                stop_event,
+                "rexec-crashloop-watcher",
+            )
+
+
+def _stop_controllers(timeout: float = 5.0) -> None:
+    """Signal the controllers to stop and wait briefly for them to exit."""
+    with _controllers_lock:
+        _controller_stop_event.set()
+        _join_controllers(timeout)
+        for thread in _controller_threads:
+            logger.warning("Controller %s is still stopping", thread.name)
+
+
+def start_background_tasks(*, settings: RexecSettings | None = None) -> None:
+    """
+    Start the background tasks in daemon threads. With leader election enabled
+    only the process holding the leader lease runs the controllers, so API
+    workers can be added without multiplying watches on the API server.
+    """
+    global _election_thread
+    resolved_settings = settings or rexec_settings
+    _stop_event.clear()
+
+    if not resolved_settings.leader_election_enabled:
+        _start_controllers(resolved_settings)
+        return
+
+    _election_thread = threading.Thread(
+        target=run_leader_election,
+        args=(_stop_event, resolved_settings),
+        kwargs={
+            "on_started_leading": lambda: _start_controllers(resolved_settings),
+            "on_stopped_leading": _stop_controllers,
+        },
+        name="rexec-leader-election",
+        daemon=True,
+    )
+    _election_thread.start()
+
+
+def stop_background_tasks(timeout: float = 5.0) -> None:
+    """Stop the background tasks, releasing the leader lease if held."""
+    global _election_thread
+    _stop_event.set()
+    if _election_thread is not None:
+        _election_thread.join(timeout)
+        _election_thread = None
+    _stop_controllers(timeout)
@@ -0,0 +1,253 @@
+"""
+Detect Rexec server pods stuck in back-off, record why, and stop them.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Dict, Tuple
+
+from kubernetes import watch
+from kubernetes.client import exceptions as k8s_exceptions
+
+from api.config.rexec_settings import RexecSettings, rexec_settings
+
+from .create_rexec_server_resources import (
+    KubernetesClients,
+    RexecDeploymentError,
+    _load_kubernetes_clients,
+    _resolve_kubeconfig_path,
+)
+from .state_store import PHASE_STOPPED, get_state_store
+
+logger = logging.getLogger(__name__)
+
+CRASH_LOOP_REASONS = {"CrashLoopBackOff"}
+IMAGE_PULL_REASONS = {"ImagePullBackOff", "ErrImagePull", "InvalidImageName"}
+# The reason a container reports right after a failed pull attempt; it waits
+# in ImagePullBackOff between attempts
+PULL_ATTEMPT_FAILED_REASON = "ErrImagePull"
+# Never retried by the kubelet, so it stops the server on first sight
+PERMANENT_PULL_REASONS = {"InvalidImageName"}
+# Short watch windows bound how long a stopped watcher keeps running; each
+# window resumes from the last resourceVersion, so nothing is replayed
+WATCH_TIMEOUT_SECONDS = 10
+RETRY_DELAY_SECONDS = 5
+
+
+class CrashLoopWatcher:
+    """
+    Watch Rexec server pods and scale a deployment to zero once its container
+    has failed ``crashloop_failure_threshold`` times.
+    """
+
+    def __init__(self, settings: RexecSettings, stop_event: threading.Event) -> None:
+        self.settings = settings
+        self.stop_event = stop_event
+        # Image pulls do not bump restartCount, so failed attempts are counted
+        # here from the pod's last seen resourceVersion and waiting reason
+        self._image_pull_failures: Dict[Tuple[str, str], int] = {}
+        self._last_seen: Dict[Tuple[str, str], Tuple[str | None, str | None]] = {}
+        self._resource_version: str | None = None
+
+    def run(self) -> None:
+        """Watch until the stop event is set, reconnecting after errors."""
+        clients: KubernetesClients | None = None
+        while not self.stop_event.is_set():
+            try:
+                if clients is None:
+                    kubeconfig_path = _resolve_kubeconfig_path(self.settings)
+                    clients = _load_kubernetes_clients(
+                        kubeconfig_path,
+                        use_in_cluster_config=self.settings.use_in_cluster_config,
+                    )
+                self._watch_once(clients)
+            except k8s_exceptions.ApiException as exc:
+                if exc.status == 410:  # resourceVersion expired; list again
+                    self._resource_version = None
+                    continue
+                logger.warning("Rexec crash-loop watch failed, retrying: %s", exc)
+                clients = None
+                self.stop_event.wait(RETRY_DELAY_SECONDS)
+            except Exception as exc:  # noqa: BLE001 - reconnect on any watch failure
+                logger.warning("Rexec crash-loop watch failed, retrying: %s", exc)
+                clients = None
+                self.stop_event.wait(RETRY_DELAY_SECONDS)
+
+    def _watch_once(self, clients: KubernetesClients) -> None:
+        pod_watch = watch.Watch()
+        options = {}
+        if self._resource_version:
+            options["resource_version"] = self._resource_version
+        try:
+            for event in pod_watch.stream(
+                clients.core_v1.list_pod_for_all_namespaces,
+                label_selector="app=rexec-server",
+                timeout_seconds=WATCH_TIMEOUT_SECONDS,
+                _request_timeout=WATCH_TIMEOUT_SECONDS + RETRY_DELAY_SECONDS,
+                **options,
+            ):
+                if self.stop_event.is_set():
+                    return
+                pod = event["object"]
+                if not pod.metadata.namespace.startswith(self.settings.namespace_prefix):
+                    continue
+                if event["type"] == "DELETED":
+                    self._forget_pod((pod.metadata.namespace, pod.metadata.name))
+                    continue
+                self._inspect_pod(clients, pod)
+        finally:
+            pod_watch.stop()
+            self._resource_version = pod_watch.resource_version or self._resource_version
+
+    def _forget_pod(self, pod_key: Tuple[str, str]) -> None:
+        self._image_pull_failures.pop(pod_key, None)
+        self._last_seen.pop(pod_key, None)
+
+    def _count_image_pull_failure(self, pod_key: Tuple[str, str], reason: str) -> int:
+        """
+        Count one failure per pull attempt: when the container moves into
+        ErrImagePull, not for every event that repeats the same state.
+        """
+        if reason in PERMANENT_PULL_REASONS:
+            return self.settings.crashloop_failure_threshold
+        _, last_reason = self._last_seen.get(pod_key, (None, None))
+        failures = self._image_pull_failures.get(pod_key, 0)
+        if reason == PULL_ATTEMPT_FAILED_REASON and last_reason != reason:
+            failures += 1
+            self._image_pull_failures[pod_key] = failures
+        return failures
+
+    def _inspect_pod(self, clients: KubernetesClients, pod) -> None:
+        """Stop the pod's deployment if its server container keeps failing."""
+        pod_key = (pod.metadata.namespace, pod.metadata.name)
+        resource_version = pod.metadata.resource_version
+        last_version, _ = self._last_seen.get(pod_key, (None, None))
+        # Reconnecting replays every pod as ADDED; skip states already counted
+        if resource_version is not None and resource_version == last_version:
+            return
+
+        reason = None
+        for status in pod.status.container_statuses or []:
+            if status.name != self.settings.container_name:
+                continue
+            waiting = status.state.waiting if status.state else None
+            reason = waiting.reason if waiting is not None else None
+            if reason in CRASH_LOOP_REASONS:
+                failures = status.restart_count or 0
+            elif reason in IMAGE_PULL_REASONS:
+                failures = self._count_image_pull_failure(pod_key, reason)
+            else:
+                continue
+
+            if failures >= self.settings.crashloop_failure_threshold:
+                self._stop_server(clients, pod, reason, waiting.message)
+        self._last_seen[pod_key] = (resource_version, reason)
+
+    def _container_log_tail(self, clients: KubernetesClients, pod, reason: str) -> str | None:
+        """Return the last lines the failed container wrote, if it ever ran."""
+        if reason in IMAGE_PULL_REASONS:
+            return None
+        try:
+            return clients.core_v1.read_namespaced_pod_log(
+                name=pod.metadata.name,
+                namespace=pod.metadata.namespace,
+                container=self.settings.container_name,
+                previous=True,
+                tail_lines=self.settings.crashloop_log_tail_lines,
+            )
+        except k8s_exceptions.ApiException as exc:
+            return f"<log unavailable: {exc.reason}>"
+
+    def _python_version(self, pod) -> str:
+        """Derive the Python version from the ``python:<version>`` image tag."""
+        for container in pod.spec.containers or []:
+            if container.name == self.settings.container_name and container.image:
+                return container.image.rpartition(":")[2]
+        return ""
+
+    def _stop_server(
+        self,
+        clients: KubernetesClients,
+        pod,
+        reason: str,
+        detail: str | None,
+    ) -> None:
+        """Scale the owning deployment to zero and record the failure."""
+        namespace = pod.metadata.namespace
+        labels = pod.metadata.labels or {}
+        digest = labels.get("digest")
+        user_id = next(
+            (
+                item.value
+                for container in pod.spec.containers or []
+                if container.name == self.settings.container_name
+                for item in container.env or []
+                if item.name == "REXEC_USER_ID"
+            ),
+            None,
+        )
+        if not digest or not user_id:
+            return
+
+        store = get_state_store(self.settings)
+        record = store.get(user_id, digest)
+        if record is not None and record.phase == PHASE_STOPPED:
+            return
+
+        # Read the log first; scaling down deletes the pod and its logs
+        log_tail = self._container_log_tail(clients, pod, reason)
+
+        label_selector = f"digest={digest}"
+        if labels.get("rexec-user"):
+            label_selector = f"{label_selector},rexec-user={labels['rexec-user']}"
+        try:
+            deployments = clients.apps_v1.list_namespaced_deployment(
+                namespace=namespace,
+                label_selector=label_selector,
+            )
+            for deployment in deployments.items:
+                clients.apps_v1.patch_namespaced_deployment_scale(
+                    name=deployment.metadata.name,
+                    namespace=namespace,
+                    body={"spec": {"replicas": 0}},
+                )
+        except k8s_exceptions.ApiException as exc:
+            raise RexecDeploymentError(
+                f"Failed to scale down failing deployment in namespace '{namespace}': {exc}"
+            ) from exc
+
+        message = f"Rexec server container failed repeatedly ({reason})"
+        if detail:
+            message = f"{message}: {detail}"
+        if record is None:
+            # Not seen by the reconciler yet; keep the failure details anyway
+            store.record(
+                user_id=user_id,
+                digest=digest,
+                namespace=namespace,
+                group_id=None,
+                python_version=self._python_version(pod),
+                requirements=[],
+                phase=PHASE_STOPPED,
+                message=message,
+                failure_log=log_tail,
+            )
+        else:
+            store.set_phase(user_id, digest, PHASE_STOPPED, message, log_tail)
+        self._forget_pod((namespace, pod.metadata.name))
+        logger.warning(
+            "Stopped Rexec server: %s",
+            message,
+            extra={"user": user_id, "digest": digest, "namespace": namespace},
+        )
+
+
+def watch_crashloops(
+    stop_event: threading.Event,
+    *,
+    settings: RexecSettings | None = None,
+) -> None:
+    """Run the crash-loop watcher until ``stop_event`` is set."""
+    CrashLoopWatcher(settings or rexec_settings, stop_event).run()
@@ -4,11 +4,16 @@ Utilities for provisioning a user-scoped Rexec server on Kubernetes.
 
 from __future__ import annotations
 
+import base64
 import hashlib
+import logging
+import re
+import shlex
 import time
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, List, Sequence, Tuple
+from typing import Dict, Iterable, List, Sequence, Tuple
 
 import yaml
 from kubernetes import client, config
@@ -18,6 +23,34 @@ from packaging.requirements import InvalidRequirement, Requirement
 from packaging.specifiers import Specifier
 
 from api.config.rexec_settings import RexecSettings, rexec_settings
+from api.services.tracing import annotate_trace, set_span_attributes, traced
+
+from .dependency_resolver import ResolverUnavailableError, resolve_requirements
+from .state_store import (
+    PHASE_CREATED,
+    PHASE_FAILED,
+    PHASE_PROVISIONING,
+    PHASE_STOPPED,
+    PROVISIONED_PHASES,
+    get_state_store,
+)
+
+logger = logging.getLogger(__name__)
+
+# Vendored checkout of https://github.com/sci-ndp/SciDx-rexec-server
+VENDORED_SERVER_CODE_DIR = Path(__file__).parent / "SciDx_rexec_server"
+
+# ConfigMaps are limited to 1 MiB in total
+SERVER_CODE_MAX_BYTES = 1024 * 1024
+SERVER_CODE_EXCLUDED_NAMES = {".git", "__pycache__", ".github", ".gitignore"}
+SERVER_CODE_ENTRYPOINT = "run_server.py"
+
+NAMESPACE_MODE_PER_USER = "per-user"
+NAMESPACE_MODE_SHARED = "shared"
+
+EXISTING_SERVER_MESSAGE = (
+    "remote execution server instance with user-provided requirements exists."
+)
 
 
 class RexecConfigurationError(Exception):
@@ -28,10 +61,23 @@ class RexecValidationError(ValueError):
     """Raised when the request payload is invalid."""
 
 
+class RexecResolutionError(RexecValidationError):
+    """Raised when the requested requirement set cannot be resolved."""
+
+
 class RexecDeploymentError(RuntimeError):
     """Raised when Kubernetes operations fail."""
 
 
+class RexecServerStoppedError(RexecDeploymentError):
+    """Raised when the requested server was stopped after repeated failures."""
+
+    def __init__(self, message: str, *, reason: str | None, log_tail: str | None) -> None:
+        super().__init__(message)
+        self.reason = reason
+        self.log_tail = log_tail
+
+
 @dataclass
 class KubernetesClients:
     """Typed container for the Kubernetes API clients we interact with."""
@@ -41,8 +87,50 @@ class KubernetesClients:
     apps_v1: client.AppsV1Api
     networking_v1: client.NetworkingV1Api
     rbac_v1: client.RbacAuthorizationV1Api
+    coordination_v1: client.CoordinationV1Api
+
 
+@dataclass(frozen=True)
+class ServerCodeArtifact:
+    """Rexec server code packaged as ConfigMap data plus its volume layout."""
+
+    name: str
+    version: str
+    data: Dict[str, str]
+    binary_data: Dict[str, str]
+    items: List[dict]
+
+    def config_map_manifest(self, namespace: str) -> dict:
+        """Return a ConfigMap manifest carrying the server code."""
+        return {
+            "apiVersion": "v1",
+            "kind": "ConfigMap",
+            "metadata": {
+                "name": self.name,
+                "namespace": namespace,
+                "labels": {
+                    "app": "rexec-server",
+                    "rexec-server-code-version": self.version,
+                },
+            },
+            "data": self.data,
+            "binaryData": self.binary_data,
+        }
 
+
+@dataclass(frozen=True)
+class ServerPlacement:
+    """Where a user's Rexec server deployment lives in the cluster."""
+
+    namespace: str
+    # Deployment name override; None keeps the manifest's name
+    deployment_name: str | None
+    # Label-safe user identifier used to tell users apart in shared namespaces
+    user_key: str
+    shared: bool
+
+
+@traced("k8s.resolve_kubeconfig")
 def _resolve_kubeconfig_path(settings: RexecSettings) -> str | None:
     """
     Resolve the kubeconfig path, preferring the mounted path inside the container
@@ -55,16 +143,14 @@ def _resolve_kubeconfig_path(settings: RexecSettings) -> str | None:
 
     if settings.kubeconfig_mount_path:
         candidates.append(settings.kubeconfig_mount_path)
-        print(f"kubeconfig mount path: {settings.kubeconfig_mount_path}")
 
     if settings.kubeconfig_local_path:
         candidates.append(settings.kubeconfig_local_path)
-        print(f"kubeconfig local path: {settings.kubeconfig_local_path}")
 
     for candidate in candidates:
         candidate_path = Path(candidate).expanduser()
         if candidate_path.exists():
-            print(f"Using kubeconfig path: {candidate_path}")
+            logger.debug("Using kubeconfig path %s", candidate_path)
             return str(candidate_path)
 
     raise RexecConfigurationError(
@@ -74,6 +160,7 @@ def _resolve_kubeconfig_path(settings: RexecSettings) -> str | None:
     )
 
 
+@traced("k8s.load_clients")
 def _load_kubernetes_clients(
     kubeconfig_path: str | None,
     *,
@@ -101,9 +188,11 @@ def _load_kubernetes_clients(
         apps_v1=client.AppsV1Api(api_client),
         networking_v1=client.NetworkingV1Api(api_client),
         rbac_v1=client.RbacAuthorizationV1Api(api_client),
+        coordination_v1=client.CoordinationV1Api(api_client),
     )
 
 
+@traced("manifest.load")
 def _load_yaml_documents(file_path: Path) -> List[dict]:
     """Load one or more YAML documents from a path."""
     if not file_path.exists():
@@ -113,6 +202,7 @@ def _load_yaml_documents(file_path: Path) -> List[dict]:
         return [doc for doc in yaml.safe_load_all(handle) if doc]
 
 
+@traced("k8s.read_namespace", k8s_verb="get")
 def _namespace_exists(clients: KubernetesClients, namespace: str) -> bool:
     """Check whether the requested namespace already exists."""
     try:
@@ -126,6 +216,7 @@ def _namespace_exists(clients: KubernetesClients, namespace: str) -> bool:
         ) from exc
 
 
+@traced("k8s.wait_for_namespace", k8s_verb="get")
 def _wait_for_namespace(
     clients: KubernetesClients,
     namespace: str,
@@ -142,6 +233,7 @@ def _wait_for_namespace(
     )
 
 
+@traced("k8s.apply_manifest", k8s_verb="create")
 def _apply_manifest(
     clients: KubernetesClients,
     manifest: dict,
@@ -153,6 +245,7 @@ def _apply_manifest(
     kind = manifest.get("kind")
     metadata = manifest.get("metadata", {})
     name = metadata.get("name", "<unknown>")
+    set_span_attributes(k8s_kind=kind, k8s_name=name, k8s_namespace=namespace)
 
     try:
         if kind == "Namespace":
@@ -202,6 +295,7 @@ def _apply_manifest(
         ) from exc
 
 
+@traced("k8s.get_cluster_ip", k8s_verb="get")
 def _get_cluster_ip(
     clients: KubernetesClients,
     service_name: str,
@@ -226,6 +320,7 @@ def _get_cluster_ip(
     return cluster_ip
 
 
+@traced("k8s.get_nodeport_endpoint", k8s_verb="list")
 def _get_nodeport_endpoint(
     clients: KubernetesClients,
     service_name: str,
@@ -278,25 +373,157 @@ def _get_nodeport_endpoint(
     return host, node_port
 
 
-def _deployment_with_digest_exists(
+@traced("k8s.find_deployment", k8s_verb="list")
+def _deployments_with_digest(
     clients: KubernetesClients,
     namespace: str,
     digest: str,
-) -> bool:
-    """Determine if a deployment already exists with the provided digest label."""
+    user_key: str | None = None,
+) -> list:
+    """
+    Return the deployments carrying the provided digest label, optionally
+    restricted to one user's deployments.
+    """
+    label_selector = f"digest={digest}"
+    if user_key:
+        label_selector = f"{label_selector},rexec-user={user_key}"
     try:
         deployments = clients.apps_v1.list_namespaced_deployment(
             namespace=namespace,
-            label_selector=f"digest={digest}",
+            label_selector=label_selector,
         )
     except k8s_exceptions.ApiException as exc:
         raise RexecDeploymentError(
             f"Failed to list deployments in namespace '{namespace}': {exc}"
         ) from exc
 
-    return bool(deployments.items)
+    return list(deployments.items)
 
 
+@traced("k8s.scale_up_deployment", k8s_verb="patch")
+def _scale_up_stopped_deployments(
+    clients: KubernetesClients,
+    namespace: str,
+    deployments: Sequence,
+) -> bool:
+    """
+    Scale deployments stopped by the crash-loop watcher back to one replica;
+    returns True when any of them was stopped.
+    """
+    restarted = False
+    for deployment in deployments:
+        if deployment.spec.replicas != 0:
+            continue
+        name = deployment.metadata.name
+        try:
+            clients.apps_v1.patch_namespaced_deployment_scale(
+                name=name,
+                namespace=namespace,
+                body={"spec": {"replicas": 1}},
+            )
+        except k8s_exceptions.ApiException as exc:
+            raise RexecDeploymentError(
+                f"Failed to scale up Deployment '{name}': {exc}"
+            ) from exc
+        restarted = True
+    return restarted
+
+
+@traced("k8s.apply_deployment", k8s_verb="create")
+def _apply_deployment(
+    clients: KubernetesClients,
+    manifest: dict,
+    placement: ServerPlacement,
+) -> bool:
+    """
+    Create the server deployment; returns False when it already exists with
+    the same digest.
+
+    In per-user mode every deployment has the manifest's name, so one left
+    from other requirements is replaced: a user runs one server at a time.
+    """
+    namespace = placement.namespace
+    name = manifest["metadata"]["name"]
+    digest = manifest["metadata"]["labels"]["digest"]
+    set_span_attributes(k8s_kind="Deployment", k8s_name=name, k8s_namespace=namespace)
+
+    try:
+        clients.apps_v1.create_namespaced_deployment(namespace=namespace, body=manifest)
+        return True
+    except k8s_exceptions.ApiException as exc:
+        if exc.status != 409:  # AlreadyExists
+            raise RexecDeploymentError(
+                f"Failed to apply Deployment '{name}': {exc}"
+            ) from exc
+
+    try:
+        existing = clients.apps_v1.read_namespaced_deployment(name=name, namespace=namespace)
+        if (existing.metadata.labels or {}).get("digest") == digest:
+            return False
+        if placement.shared:
+            raise RexecDeploymentError(
+                f"Deployment '{name}' in namespace '{namespace}' belongs to "
+                "another requirement set."
+            )
+        manifest["metadata"]["resourceVersion"] = existing.metadata.resource_version
+        clients.apps_v1.replace_namespaced_deployment(
+            name=name,
+            namespace=namespace,
+            body=manifest,
+        )
+    except k8s_exceptions.ApiException as exc:
+        raise RexecDeploymentError(
+            f"Failed to replace Deployment '{name}': {exc}"
+        ) from exc
+    logger.info(
+        "Replaced Rexec server deployment for other requirements",
+        extra={"namespace": namespace, "digest": digest},
+    )
+    return True
+
+
+@traced("placement")
+def _server_placement(
+    user_id: str,
+    digest: str,
+    settings: RexecSettings,
+) -> ServerPlacement:
+    """
+    Choose the namespace and deployment name for a user's server.
+
+    In per-user mode every user gets a dedicated namespace. In shared mode
+    users are hashed onto a fixed set of shard namespaces, and the deployment
+    name is derived from the user ID and requirement digest.
+    """
+    user_key = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:16]
+
+    if settings.namespace_mode == NAMESPACE_MODE_PER_USER:
+        return ServerPlacement(
+            namespace=f"{settings.namespace_prefix}{user_id}",
+            deployment_name=None,
+            user_key=user_key,
+            shared=False,
+        )
+    if settings.namespace_mode != NAMESPACE_MODE_SHARED:
+        raise RexecConfigurationError(
+            f"Unsupported namespace mode '{settings.namespace_mode}'; expected "
+            f"'{NAMESPACE_MODE_PER_USER}' or '{NAMESPACE_MODE_SHARED}'."
+        )
+    if settings.shared_namespace_count < 1:
+        raise RexecConfigurationError(
+            "'REXEC_SHARED_NAMESPACE_COUNT' must be at least 1."
+        )
+
+    shard = int(user_key, 16) % settings.shared_namespace_count
+    return ServerPlacement(
+        namespace=f"{settings.namespace_prefix}shared-{shard}",
+        deployment_name=f"{settings.container_name}-{user_key[:10]}-{digest[:10]}",
+        user_key=user_key,
+        shared=True,
+    )
+
+
+@traced("requirements.parse")
 def _parse_requirements(requirements: Iterable[str]) -> tuple[str, List[str]]:
     """
     Separate the python version requirement from the rest of the packages.
@@ -340,9 +567,42 @@ def _parse_requirements(requirements: Iterable[str]) -> tuple[str, List[str]]:
     return python_version, user_requirements
 
 
+@traced("requirements.validate_python")
+def _validate_python_version(python_version: str, settings: RexecSettings) -> None:
+    """
+    Reject (or warn about) Python versions outside the supported set.
+    """
+    supported_versions = settings.python_versions
+    if not supported_versions or python_version in supported_versions:
+        return
+
+    message = (
+        f"Python version '{python_version}' is not supported. "
+        f"Supported versions: {', '.join(supported_versions)}."
+    )
+    if settings.reject_unsupported_python_versions:
+        raise RexecValidationError(message)
+    logger.warning(message)
+
+
+def _python_image(python_version: str) -> str:
+    """Return the container image used for a given Python version."""
+    return f"python:{python_version}"
+
+
+def _image_pull_policy(python_version: str, settings: RexecSettings) -> str:
+    """
+    Use the node-local image for versions kept warm by the pre-pull DaemonSet.
+    """
+    if settings.image_prepull_enabled and python_version in settings.python_versions:
+        return "IfNotPresent"
+    return "Always"
+
+
+@traced("requirements.load_builtin")
 def _load_builtin_requirements() -> List[str]:
     """Read the packaged requirements for the base Rexec server image."""
-    requirements_file = Path(__file__).parent / "SciDx_rexec_server" / "requirements.txt"
+    requirements_file = VENDORED_SERVER_CODE_DIR / "requirements.txt"
     if not requirements_file.exists():
         raise RexecConfigurationError(
             f"Builtin requirements file missing: {requirements_file}"
@@ -358,9 +618,179 @@ def _load_builtin_requirements() -> List[str]:
     return requirements
 
 
+@traced("server_code.build")
+@lru_cache(maxsize=4)
+def _build_server_code_artifact(source_dir: str) -> ServerCodeArtifact:
+    """
+    Package a Rexec server code checkout for delivery through a ConfigMap.
+
+    Nested paths are flattened into valid ConfigMap keys and restored through
+    the volume ``items`` list. The name and version label carry a content
+    hash, so a changed checkout produces a new ConfigMap instead of mutating
+    one in use.
+    """
+    root = Path(source_dir).expanduser()
+    if not (root / SERVER_CODE_ENTRYPOINT).is_file():
+        raise RexecConfigurationError(
+            f"Rexec server code not found: '{root / SERVER_CODE_ENTRYPOINT}' is missing. "
+            "Check out the SciDx_rexec_server submodule, point "
+            "'REXEC_SERVER_CODE_PATH' at a checkout, or set "
+            "'REXEC_SERVER_CODE_SOURCE=git'."
+        )
+
+    data: Dict[str, str] = {}
+    binary_data: Dict[str, str] = {}
+    items: List[dict] = []
+    content_hash = hashlib.sha1()
+    total_bytes = 0
+
+    for file_path in sorted(root.rglob("*")):
+        relative = file_path.relative_to(root)
+        if not file_path.is_file() or SERVER_CODE_EXCLUDED_NAMES.intersection(relative.parts):
+            continue
+
+        content = file_path.read_bytes()
+        relative_path = relative.as_posix()
+        key = re.sub(r"[^-._a-zA-Z0-9]", "_", relative_path)
+        while key in data or key in binary_data:
+            key = f"_{key}"
+        items.append({"key": key, "path": relative_path})
+        content_hash.update(relative_path.encode("utf-8") + b"\0" + content)
+
+        try:
+            data[key] = content.decode("utf-8")
+            encoded_size = len(content)
+        except UnicodeDecodeError:
+            binary_data[key] = base64.b64encode(content).decode("ascii")
+            encoded_size = len(binary_data[key])
+
+        # The limit applies to the stored object: keys plus base64 binaryData
+        total_bytes += len(key) + encoded_size
+        if total_bytes > SERVER_CODE_MAX_BYTES:
+            raise RexecConfigurationError(
+                f"Rexec server code in '{root}' exceeds the ConfigMap size limit; "
+                "set 'REXEC_SERVER_CODE_SOURCE=git' instead."
+            )
+
+    version = content_hash.hexdigest()[:12]
+    return ServerCodeArtifact(
+        name=f"rexec-server-code-{version}",
+        version=version,
+        data=data,
+        binary_data=binary_data,
+        items=items,
+    )
+
+
+@traced("server_code.artifact")
+def _server_code_artifact(settings: RexecSettings) -> ServerCodeArtifact | None:
+    """
+    Return the packaged server code, or None when the code is fetched with git
+    at container start.
+    """
+    if settings.server_code_source == "git":
+        return None
+    if settings.server_code_source != "configmap":
+        raise RexecConfigurationError(
+            f"Unsupported server code source '{settings.server_code_source}'; "
+            "expected 'configmap' or 'git'."
+        )
+
+    if settings.server_code_version:
+        raise RexecConfigurationError(
+            "'REXEC_SERVER_CODE_VERSION' only applies to "
+            "'REXEC_SERVER_CODE_SOURCE=git'; the ConfigMap is pinned by the "
+            "content of the checkout. Check out the wanted version instead."
+        )
+    source_dir = settings.server_code_path or str(VENDORED_SERVER_CODE_DIR)
+    return _build_server_code_artifact(source_dir)
+
+
+def check_server_code(*, settings: RexecSettings | None = None) -> None:
+    """
+    Validate the server code source when the API starts, so an unpinned git
+    source or a missing or oversized checkout stops startup instead of
+    failing (or drifting) on every spawn request.
+    """
+    resolved_settings = settings or rexec_settings
+    _server_code_artifact(resolved_settings)
+    _server_code_setup(resolved_settings)
+
+
+@traced("server_code.setup")
+def _server_code_setup(settings: RexecSettings) -> Tuple[str, str]:
+    """
+    Return the shell snippet that provides the server code and the directory
+    the server is started from.
+    """
+    if settings.server_code_source != "git":
+        return "", settings.server_code_mount_path
+
+    if not settings.server_code_version:
+        raise RexecConfigurationError(
+            "'REXEC_SERVER_CODE_VERSION' must pin a tag or commit of "
+            f"{settings.server_code_repository} when 'REXEC_SERVER_CODE_SOURCE=git'."
+        )
+
+    repository = shlex.quote(settings.server_code_repository)
+    version = shlex.quote(settings.server_code_version)
+    setup = (
+        f'echo "git clone {repository} server @ {version}";\n'
+        f"git clone {repository} server && git -C server checkout {version} || exit 1;"
+    )
+    return setup, "server"
+
+
+@traced("requirements.resolve")
+def _resolve_lock(
+    python_version: str,
+    builtin_requirements: Sequence[str],
+    user_requirements: Sequence[str],
+    settings: RexecSettings,
+) -> List[str] | None:
+    """
+    Resolve the builtin plus user requirements before anything is created.
+
+    Returns the pinned lock, or None when resolution is disabled or the resolver
+    is unavailable. Raises RexecResolutionError for unsatisfiable sets.
+    """
+    if not settings.resolver_enabled:
+        return None
+
+    requirements = [*builtin_requirements, *user_requirements]
+    resolution_key = hashlib.sha1(
+        "\n".join(
+            [f"python=={python_version}", settings.resolver_index_url or "", *sorted(requirements)]
+        ).encode("utf-8")
+    ).hexdigest()
+
+    store = get_state_store(settings)
+    cached = store.get_resolution(
+        resolution_key,
+        max_failure_age_seconds=settings.resolver_failure_cache_seconds,
+    )
+    if cached is not None:
+        lock, error = cached.lock, cached.error
+    else:
+        try:
+            result = resolve_requirements(python_version, requirements, settings)
+        except ResolverUnavailableError as exc:
+            logger.warning("Skipping pre-flight dependency resolution: %s", exc)
+            return None
+        store.record_resolution(resolution_key, python_version, result.lock, result.error)
+        lock, error = result.lock, result.error
+
+    if lock is None:
+        raise RexecResolutionError(
+            f"Requirements cannot be installed on Python {python_version}:\n{error}"
+        )
+    return lock
+
+
+@traced("manifest.prepare")
 def _prepare_deployment_manifest(
     manifest: dict,
-    namespace: str,
+    placement: ServerPlacement,
     digest: str,
     python_version: str,
     builtin_requirements: Sequence[str],
@@ -368,45 +798,95 @@ def _prepare_deployment_manifest(
     broker_addr: str,
     user_id: str,
     settings: RexecSettings,
+    server_code: ServerCodeArtifact | None = None,
+    locked_requirements: Sequence[str] | None = None,
 ) -> dict:
     """
-    Mutate a deployment manifest in-place with namespace, labels, image, and env vars
+    Mutate a deployment manifest in-place with namespace, name, labels, image,
+    env vars, and the server code volume
     """
     manifest.setdefault("metadata", {})
-    manifest["metadata"]["namespace"] = namespace
+    manifest["metadata"]["namespace"] = placement.namespace
+    if placement.deployment_name:
+        manifest["metadata"]["name"] = placement.deployment_name
 
     labels = manifest["metadata"].setdefault("labels", {})
     labels["digest"] = digest
+    labels["rexec-user"] = placement.user_key
 
     spec = manifest.setdefault("spec", {})
     template = spec.setdefault("template", {})
     template_metadata = template.setdefault("metadata", {})
-    template_metadata.setdefault("labels", {})["digest"] = digest
+    template_labels = template_metadata.setdefault("labels", {})
+    template_labels["digest"] = digest
+    template_labels["rexec-user"] = placement.user_key
+
+    # Deployments sharing a namespace need selectors that only match their own pods
+    if placement.deployment_name:
+        spec.setdefault("selector", {}).setdefault("matchLabels", {})[
+            "rexec-instance"
+        ] = placement.deployment_name
+        template_labels["rexec-instance"] = placement.deployment_name
 
     pod_spec = template.setdefault("spec", {})
     containers = pod_spec.setdefault("containers", [])
 
-    builtin_requirements_str = " ".join(builtin_requirements)
-    user_requirements_str = " ".join(user_requirements)
+    builtin_requirements_str = " ".join(shlex.quote(item) for item in builtin_requirements)
+    user_requirements_str = " ".join(shlex.quote(item) for item in user_requirements)
+    # Install the pre-resolved lock when available so the pod skips resolution
+    if locked_requirements:
+        requirements_str = " ".join(shlex.quote(item) for item in locked_requirements)
+    else:
+        requirements_str = f"{builtin_requirements_str} {user_requirements_str}".strip()
+    # Install from the index the lock was resolved against
+    if settings.resolver_index_url:
+        requirements_str = (
+            f"--index-url {shlex.quote(settings.resolver_index_url)} {requirements_str}"
+        )
+    server_code_setup, server_code_dir = _server_code_setup(settings)
+
+    if server_code is not None:
+        pod_spec.setdefault("volumes", []).append(
+            {
+                "name": "server-code",
+                "configMap": {
+                    "name": server_code.name,
+                    "items": server_code.items,
+                },
+            }
+        )
 
     for container in containers:
         if container.get("name") != settings.container_name:
             continue
 
         # Set the container image to the specified Python version
-        container["image"] = f"python:{python_version}"
+        container["image"] = _python_image(python_version)
+        container["imagePullPolicy"] = _image_pull_policy(python_version, settings)
 
         # Set environment variable for user_id; for identifying user-specific server
         env = container.setdefault("env", [])
         if not any(item.get("name") == "REXEC_USER_ID" for item in env):
             env.append({"name": "REXEC_USER_ID", "value": user_id})
 
+        if server_code is not None:
+            container.setdefault("volumeMounts", []).append(
+                {
+                    "name": "server-code",
+                    "mountPath": settings.server_code_mount_path,
+                    "readOnly": True,
+                }
+            )
+
         command = container.get("command")
         if command and isinstance(command, list) and command:
             command[-1] = (
                 command[-1]
+                .replace("${requirements}", requirements_str)
                 .replace("${builtin_requirements}", builtin_requirements_str)
                 .replace("${user_requirements}", user_requirements_str)
+                .replace("${server_code_setup}", server_code_setup)
+                .replace("${server_code_dir}", server_code_dir)
                 .replace("${broker_addr}", broker_addr)
                 .replace("${broker_port}", str(settings.broker_port))
             )
@@ -414,84 +894,268 @@ def _prepare_deployment_manifest(
     return manifest
 
 
+@traced("k8s.ensure_namespace")
+def _ensure_namespace(
+    clients: KubernetesClients,
+    namespace: str,
+    settings: RexecSettings,
+) -> bool:
+    """Create the namespace if needed; returns True when it already existed."""
+    if _namespace_exists(clients, namespace):
+        return True
+
+    namespace_manifest = {
+        "apiVersion": "v1",
+        "kind": "Namespace",
+        "metadata": {"name": namespace},
+    }
+    _apply_manifest(clients, namespace_manifest, namespace=namespace)
+    _wait_for_namespace(
+        clients,
+        namespace,
+        settings.namespace_wait_timeout_seconds,
+    )
+    return False
+
+
+# Shard namespaces already created and isolated by this process
+_ready_shared_namespaces: set[str] = set()
+
+
+@traced("k8s.ensure_shared_namespace")
+def _ensure_shared_namespace(
+    clients: KubernetesClients,
+    namespace: str,
+    settings: RexecSettings,
+) -> None:
+    """
+    Create a shard namespace with the NetworkPolicy isolating its servers,
+    skipping the API round trips once this process has done so.
+    """
+    if namespace in _ready_shared_namespaces:
+        return
+
+    _ensure_namespace(clients, namespace, settings)
+    _apply_network_policies(clients, namespace, settings)
+    _ready_shared_namespaces.add(namespace)
+
+
+def _apply_network_policies(
+    clients: KubernetesClients,
+    namespace: str,
+    settings: RexecSettings,
+) -> None:
+    """Apply the NetworkPolicy isolating the servers in a shard namespace."""
+    manifest_dir = Path(__file__).parent / "k8s"
+    for manifest in _load_yaml_documents(
+        manifest_dir / settings.network_policy_manifest_name
+    ):
+        manifest.setdefault("metadata", {})["namespace"] = namespace
+        _apply_manifest(clients, manifest, namespace=namespace)
+
+
+def _is_not_found(exc: Exception) -> bool:
+    """Whether a wrapped Kubernetes API error was a 404."""
+    cause = exc.__cause__
+    return isinstance(cause, k8s_exceptions.ApiException) and cause.status == 404
+
+
+@traced("provision")
+def _provision_rexec_server(
+    settings: RexecSettings,
+    user_id: str,
+    placement: ServerPlacement,
+    digest: str,
+    python_version: str,
+    builtin_requirements: Sequence[str],
+    user_requirements: Sequence[str],
+    locked_requirements: Sequence[str] | None,
+    server_code: ServerCodeArtifact | None,
+) -> bool:
+    """
+    Apply the namespace and server manifests for one user and requirement digest.
+
+    Returns False when a running deployment with the digest already exists; a
+    stopped one is scaled back up.
+    """
+    kubeconfig_path = _resolve_kubeconfig_path(settings)
+    clients = _load_kubernetes_clients(
+        kubeconfig_path,
+        use_in_cluster_config=settings.use_in_cluster_config,
+    )
+
+    namespace = placement.namespace
+    existing = []
+    if placement.shared:
+        _ensure_shared_namespace(clients, namespace, settings)
+        existing = _deployments_with_digest(clients, namespace, digest, placement.user_key)
+    elif _ensure_namespace(clients, namespace, settings):
+        existing = _deployments_with_digest(clients, namespace, digest)
+    if existing:
+        return _scale_up_stopped_deployments(clients, namespace, existing)
+
+    manifest_dir = Path(__file__).parent / "k8s"
+    deployment_manifests = _load_yaml_documents(
+        manifest_dir / settings.deployment_manifest_name
+    )
+
+    # Get broker internal ClusterIP for Rexec server to connect to
+    broker_addr = _get_cluster_ip(
+        clients,
+        settings.broker_service_name,
+        settings.broker_namespace,
+    )
+
+    created = False
+    try:
+        # The server code ConfigMap must exist before the Deployment mounts it
+        if server_code is not None:
+            _apply_manifest(
+                clients,
+                server_code.config_map_manifest(namespace),
+                namespace=namespace,
+            )
+
+        # Patch the Deployment(./k8s/rexec_server_deployment.yaml) manifests with dynamic values
+        for manifest in deployment_manifests:
+            if manifest.get("kind") == "Deployment":
+                manifest = _prepare_deployment_manifest(
+                    manifest,
+                    placement,
+                    digest,
+                    python_version,
+                    builtin_requirements,
+                    user_requirements,
+                    broker_addr,
+                    user_id,
+                    settings,
+                    server_code,
+                    locked_requirements,
+                )
+                created = _apply_deployment(clients, manifest, placement)
+            else:
+                manifest.setdefault("metadata", {})["namespace"] = namespace
+                _apply_manifest(clients, manifest, namespace=namespace)
+    except RexecDeploymentError as exc:
+        if placement.shared and _is_not_found(exc):
+            # The shard namespace was deleted; recreate it on the next request
+            _ready_shared_namespaces.discard(namespace)
+        raise
+
+    return created
+
+
+@traced("create_rexec_server_resources")
 def create_rexec_server_resources(
     group_id: str,
     user_id: str,
     requirements: Iterable[str],
     *,
     settings: RexecSettings | None = None,
+    retry_stopped: bool = False,
 ) -> str:
     """
     Create the Kubernetes resources required for a user's dedicated Rexec server.
+
+    A server stopped by the crash-loop watcher is only started again when
+    ``retry_stopped`` is set.
     """
     resolved_settings = settings or rexec_settings
-    kubeconfig_path = _resolve_kubeconfig_path(resolved_settings)
-    clients = _load_kubernetes_clients(
-        kubeconfig_path,
-        use_in_cluster_config=resolved_settings.use_in_cluster_config,
-    )
-
-    namespace = f"{resolved_settings.namespace_prefix}{user_id}"
-
-    namespace_exists = _namespace_exists(clients, namespace)
-    if not namespace_exists:
-        namespace_manifest = {
-            "apiVersion": "v1",
-            "kind": "Namespace",
-            "metadata": {"name": namespace},
-        }
-        _apply_manifest(clients, namespace_manifest, namespace=namespace)
-        _wait_for_namespace(
-            clients,
-            namespace,
-            resolved_settings.namespace_wait_timeout_seconds,
-        )
 
+    # Validate the request before touching the cluster
     python_version, user_requirements = _parse_requirements(requirements)
+    _validate_python_version(python_version, resolved_settings)
+    server_code = _server_code_artifact(resolved_settings)
 
     digest_components = sorted(user_requirements)
     digest_components.insert(0, f"python=={python_version}")
     digest = hashlib.sha1(" ".join(digest_components).encode("utf-8")).hexdigest()
 
-    if namespace_exists and _deployment_with_digest_exists(clients, namespace, digest):
-        return "remote execution server instance with user-provided requirements exists."
+    annotate_trace(user=user_id, digest=digest)
+    placement = _server_placement(user_id, digest, resolved_settings)
+
+    # Duplicates are detected locally; the reconciler keeps the store in sync
+    store = get_state_store(resolved_settings)
+    record = store.get(user_id, digest)
+    if record is not None and record.phase in PROVISIONED_PHASES:
+        return EXISTING_SERVER_MESSAGE
+    if record is not None and record.phase == PHASE_STOPPED and not retry_stopped:
+        raise RexecServerStoppedError(
+            "remote execution server instance with user-provided requirements "
+            "was stopped after repeated failures; spawn again with retry=true "
+            "to restart it.",
+            reason=record.message,
+            log_tail=record.failure_log,
+        )
 
+    # Reject unsatisfiable requirement sets before creating any pods
     builtin_requirements = _load_builtin_requirements()
-
-    manifest_dir = Path(__file__).parent / "k8s"
-    deployment_manifests = _load_yaml_documents(
-        manifest_dir / resolved_settings.deployment_manifest_name
+    locked_requirements = _resolve_lock(
+        python_version,
+        builtin_requirements,
+        user_requirements,
+        resolved_settings,
     )
 
-    # Get broker internal ClusterIP for Rexec server to connect to
-    broker_addr = _get_cluster_ip(
-        clients,
-        resolved_settings.broker_service_name,
-        resolved_settings.broker_namespace,
+    store.record(
+        user_id=user_id,
+        digest=digest,
+        namespace=placement.namespace,
+        group_id=group_id,
+        python_version=python_version,
+        requirements=digest_components,
+        phase=PHASE_PROVISIONING,
     )
+    try:
+        created = _provision_rexec_server(
+            resolved_settings,
+            user_id,
+            placement,
+            digest,
+            python_version,
+            builtin_requirements,
+            user_requirements,
+            locked_requirements,
+            server_code,
+        )
+    except Exception as exc:
+        store.set_phase(user_id, digest, PHASE_FAILED, str(exc))
+        raise
+    store.set_phase(user_id, digest, PHASE_CREATED)
 
-    # Patch the Deployment(./k8s/rexec_server_deployment.yaml) manifests with dynamic values
-    for manifest in deployment_manifests:
-        if manifest.get("kind") == "Deployment":
-            manifest = _prepare_deployment_manifest(
-                manifest,
-                namespace,
-                digest,
-                python_version,
-                builtin_requirements,
-                user_requirements,
-                broker_addr,
-                user_id,
-                resolved_settings,
-            )
-        else:
-            manifest.setdefault("metadata", {})["namespace"] = namespace
+    if not created:
+        return EXISTING_SERVER_MESSAGE
+    return f"Remote Execution server created for user: {user_id}"
 
-        _apply_manifest(clients, manifest, namespace=namespace)
 
-    return f"Remote Execution server created for user: {user_id}"
+@traced("get_rexec_server_status")
+def get_rexec_server_status(
+    user_id: str,
+    *,
+    settings: RexecSettings | None = None,
+) -> List[dict]:
+    """
+    Return the recorded Rexec servers for a user, newest first, including the
+    failure reason and log tail of stopped servers.
+    """
+    resolved_settings = settings or rexec_settings
+    return [
+        {
+            "namespace": record.namespace,
+            "digest": record.digest,
+            "python_version": record.python_version,
+            "requirements": record.requirements,
+            "phase": record.phase,
+            "message": record.message,
+            "failure_log": record.failure_log,
+            "created_at": record.created_at,
+            "updated_at": record.updated_at,
+        }
+        for record in get_state_store(resolved_settings).list_for_user(user_id)
+    ]
 
 
+@traced("get_rexec_broker_config")
 def get_rexec_broker_config(
     *,
     settings: RexecSettings | None = None,
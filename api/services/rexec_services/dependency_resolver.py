@@ -0,0 +1,293 @@
+"""
+Pre-flight resolution of Rexec server requirements with pip.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.utils import canonicalize_name
+from packaging.version import InvalidVersion, Version
+
+from api.config.rexec_settings import RexecSettings
+
+# pip output that means the requirement set itself cannot be satisfied
+RESOLUTION_FAILURE_MARKERS = (
+    "ResolutionImpossible",
+    "conflicting dependencies",
+    "Invalid requirement",
+)
+# pip output that means no wheel matched; the project may still ship sdists,
+# which the wheel-only dry run cannot see
+NO_DISTRIBUTION_MARKERS = (
+    "No matching distribution found",
+    "Could not find a version that satisfies",
+)
+_MISSING_REQUIREMENT_PATTERNS = (
+    re.compile(
+        r"satisfies the requirement (?P<requirement>.+?) "
+        r"(?:\(from (?!versions:)[^)]*\) )?\(from versions:"
+    ),
+    re.compile(r"No matching distribution found for (?P<requirement>.+)$", re.MULTILINE),
+)
+# pip output that means the index could not be reached; resolution is skipped
+INDEX_UNAVAILABLE_MARKERS = (
+    "NewConnectionError",
+    "Max retries exceeded",
+    "ConnectTimeoutError",
+    "ReadTimeoutError",
+    "ProxyError",
+    "SSLError",
+    "Temporary failure in name resolution",
+)
+EXPLANATION_MAX_LINES = 20
+
+
+@dataclass
+class ResolutionResult:
+    """Outcome of a resolver run: a lock on success, or pip's explanation."""
+
+    lock: List[str] | None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.lock is not None
+
+
+class ResolverUnavailableError(RuntimeError):
+    """Raised when the resolver could not run to a conclusive result."""
+
+
+def _pip_command(
+    python_version: str,
+    requirements: Sequence[str],
+    report_path: Path,
+    target_dir: Path,
+    settings: RexecSettings,
+) -> List[str]:
+    """Build a pip dry-run that resolves for the pod's Python version."""
+    command = [
+        sys.executable,
+        "-m",
+        "pip",
+        "install",
+        "--dry-run",
+        "--ignore-installed",
+        # pip only accepts --python-version for wheel-only installs into a target
+        "--only-binary=:all:",
+        "--target",
+        str(target_dir),
+        "--python-version",
+        python_version,
+        "--report",
+        str(report_path),
+        "--quiet",
+        "--disable-pip-version-check",
+        "--no-input",
+    ]
+    command.extend(_index_options(settings))
+    command.extend(requirements)
+    return command
+
+
+def _index_options(settings: RexecSettings) -> List[str]:
+    if settings.resolver_index_url:
+        return ["--index-url", settings.resolver_index_url]
+    return []
+
+
+def _available_versions(
+    name: str,
+    python_version: str,
+    settings: RexecSettings,
+) -> List[str]:
+    """
+    List every version of a project the index offers for the Python version,
+    sdists included. Nothing is downloaded or built.
+    """
+    command = [
+        sys.executable,
+        "-m",
+        "pip",
+        "index",
+        "versions",
+        name,
+        "--pre",
+        "--python-version",
+        python_version,
+        "--disable-pip-version-check",
+        "--no-input",
+        *_index_options(settings),
+    ]
+    try:
+        completed = subprocess.run(
+            command,
+            capture_output=True,
+            text=True,
+            timeout=settings.resolver_timeout_seconds,
+            check=False,
+        )
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        raise ResolverUnavailableError(f"pip index did not complete: {exc}") from exc
+
+    if completed.returncode != 0:
+        if "No matching distribution found" in (completed.stderr or ""):
+            return []
+        raise ResolverUnavailableError(
+            f"pip index exited with status {completed.returncode}: "
+            f"{_explain_failure(completed.stderr or '')}"
+        )
+    for line in completed.stdout.splitlines():
+        if line.startswith("Available versions:"):
+            return [v.strip() for v in line.partition(":")[2].split(",") if v.strip()]
+    return []
+
+
+def _missing_requirement_exists(
+    stderr: str,
+    python_version: str,
+    settings: RexecSettings,
+) -> bool:
+    """
+    Return whether the requirement pip found no wheel for is published in
+    some other form, e.g. only as an sdist, which the pod can still install.
+    """
+    requirement = None
+    for pattern in _MISSING_REQUIREMENT_PATTERNS:
+        match = pattern.search(stderr)
+        if match:
+            requirement = match.group("requirement").strip()
+            break
+    if requirement is None:
+        raise ResolverUnavailableError(
+            f"Unrecognized pip resolver output: {_explain_failure(stderr)}"
+        )
+
+    try:
+        parsed = Requirement(requirement)
+    except InvalidRequirement as exc:
+        raise ResolverUnavailableError(
+            f"Unrecognized requirement in pip output: {requirement}"
+        ) from exc
+
+    for version in _available_versions(parsed.name, python_version, settings):
+        try:
+            if parsed.specifier.contains(Version(version), prereleases=True):
+                return True
+        except InvalidVersion:
+            continue
+    return False
+
+
+def _direct_references(requirements: Sequence[str]) -> Dict[str, str]:
+    """Map project names to the requirements that pin a URL or VCS checkout."""
+    references: Dict[str, str] = {}
+    for requirement in requirements:
+        try:
+            parsed = Requirement(requirement)
+        except InvalidRequirement:
+            continue
+        if parsed.url:
+            references[canonicalize_name(parsed.name)] = requirement
+    return references
+
+
+def _lock_entry(item: dict, direct_references: Dict[str, str]) -> str:
+    """
+    Pin a resolved distribution. Direct references keep their URL, since
+    ``name==version`` would send the pod to the index for a build it may
+    not have.
+    """
+    name = item["metadata"]["name"]
+    if not item.get("is_direct"):
+        return f"{name}=={item['metadata']['version']}"
+
+    original = direct_references.get(canonicalize_name(name))
+    if original is not None:
+        return original
+    download_info = item.get("download_info", {})
+    vcs_info = download_info.get("vcs_info")
+    if vcs_info:
+        return f"{name} @ {vcs_info['vcs']}+{download_info['url']}@{vcs_info['commit_id']}"
+    return f"{name} @ {download_info['url']}"
+
+
+def _explain_failure(stderr: str) -> str:
+    """Keep the tail of pip's error output as the user-facing explanation."""
+    lines = [line.rstrip() for line in stderr.splitlines() if line.strip()]
+    return "\n".join(lines[-EXPLANATION_MAX_LINES:])
+
+
+def resolve_requirements(
+    python_version: str,
+    requirements: Sequence[str],
+    settings: RexecSettings,
+) -> ResolutionResult:
+    """
+    Resolve the full requirement set for a Python version without installing it.
+
+    Returns the pinned lock on success, or the resolver's explanation when the
+    set is unsatisfiable: conflicting pins, invalid requirements, or a version
+    the index does not publish at all. Raises ResolverUnavailableError when
+    pip fails for reasons unrelated to the requirements (timeouts, unreachable
+    index) or when a requirement is only published as an sdist, which the
+    wheel-only dry run cannot resolve.
+    """
+    with tempfile.TemporaryDirectory(prefix="rexec-resolve-") as work_dir:
+        report_path = Path(work_dir) / "report.json"
+        command = _pip_command(
+            python_version,
+            requirements,
+            report_path,
+            Path(work_dir) / "target",
+            settings,
+        )
+        try:
+            completed = subprocess.run(
+                command,
+                capture_output=True,
+                text=True,
+                timeout=settings.resolver_timeout_seconds,
+                check=False,
+            )
+        except (OSError, subprocess.TimeoutExpired) as exc:
+            raise ResolverUnavailableError(f"pip resolver did not complete: {exc}") from exc
+
+        if completed.returncode != 0:
+            stderr = completed.stderr or ""
+            if any(marker in stderr for marker in INDEX_UNAVAILABLE_MARKERS):
+                raise ResolverUnavailableError(
+                    f"Package index unavailable: {_explain_failure(stderr)}"
+                )
+            if any(marker in stderr for marker in RESOLUTION_FAILURE_MARKERS):
+                return ResolutionResult(lock=None, error=_explain_failure(stderr))
+            if any(marker in stderr for marker in NO_DISTRIBUTION_MARKERS):
+                if _missing_requirement_exists(stderr, python_version, settings):
+                    raise ResolverUnavailableError(
+                        f"No wheel available to resolve against: {_explain_failure(stderr)}"
+                    )
+                return ResolutionResult(lock=None, error=_explain_failure(stderr))
+            raise ResolverUnavailableError(
+                f"pip resolver exited with status {completed.returncode}: "
+                f"{_explain_failure(stderr)}"
+            )
+
+        try:
+            report = json.loads(report_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            raise ResolverUnavailableError(f"Unreadable pip report: {exc}") from exc
+
+    direct_references = _direct_references(requirements)
+    lock = sorted(
+        _lock_entry(item, direct_references) for item in report.get("install", [])
+    )
+    return ResolutionResult(lock=lock)
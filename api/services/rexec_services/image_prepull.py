@@ -0,0 +1,134 @@
+"""
+Keep the supported Python base images warm on every cluster node.
+"""
+
+from __future__ import annotations
+
+import copy
+from pathlib import Path
+
+from kubernetes.client import exceptions as k8s_exceptions
+
+from api.config.rexec_settings import RexecSettings, rexec_settings
+
+from .create_rexec_server_resources import (
+    KubernetesClients,
+    RexecDeploymentError,
+    _apply_manifest,
+    _load_kubernetes_clients,
+    _load_yaml_documents,
+    _namespace_exists,
+    _python_image,
+    _resolve_kubeconfig_path,
+    _wait_for_namespace,
+)
+
+
+def _prepare_prepull_manifest(manifest: dict, settings: RexecSettings) -> dict:
+    """
+    Return a copy of the DaemonSet manifest with one init container per
+    supported Python image.
+    """
+    manifest = copy.deepcopy(manifest)
+    manifest.setdefault("metadata", {})["namespace"] = settings.image_prepull_namespace
+
+    pod_spec = (
+        manifest.setdefault("spec", {})
+        .setdefault("template", {})
+        .setdefault("spec", {})
+    )
+    pod_spec["initContainers"] = [
+        {
+            "name": f"prepull-python-{version.replace('.', '-')}",
+            "image": _python_image(version),
+            "imagePullPolicy": "Always",
+            "command": ["sh", "-c", "true"],
+        }
+        for version in settings.python_versions
+    ]
+    return manifest
+
+
+def _apply_daemon_set(
+    clients: KubernetesClients,
+    manifest: dict,
+    namespace: str,
+) -> None:
+    """Create the DaemonSet, or replace it so the image list stays current."""
+    name = manifest["metadata"]["name"]
+    try:
+        clients.apps_v1.create_namespaced_daemon_set(
+            namespace=namespace,
+            body=manifest,
+        )
+        return
+    except k8s_exceptions.ApiException as exc:
+        if exc.status != 409:  # AlreadyExists
+            raise RexecDeploymentError(
+                f"Failed to apply DaemonSet '{name}': {exc}"
+            ) from exc
+
+    # A patch would merge initContainers by name and never drop the images of
+    # versions removed from the supported set, so replace the whole object
+    try:
+        existing = clients.apps_v1.read_namespaced_daemon_set(
+            name=name,
+            namespace=namespace,
+        )
+        manifest = copy.deepcopy(manifest)
+        manifest["metadata"]["resourceVersion"] = existing.metadata.resource_version
+        clients.apps_v1.replace_namespaced_daemon_set(
+            name=name,
+            namespace=namespace,
+            body=manifest,
+        )
+    except k8s_exceptions.ApiException as exc:
+        raise RexecDeploymentError(
+            f"Failed to update DaemonSet '{name}': {exc}"
+        ) from exc
+
+
+def ensure_image_prepull(*, settings: RexecSettings | None = None) -> bool:
+    """
+    Create or update the image pre-pull DaemonSet for the supported Python versions.
+
+    Returns False when pre-pulling is disabled or no versions are configured.
+    """
+    resolved_settings = settings or rexec_settings
+    if not resolved_settings.image_prepull_enabled:
+        return False
+    if not resolved_settings.python_versions:
+        return False
+
+    kubeconfig_path = _resolve_kubeconfig_path(resolved_settings)
+    clients = _load_kubernetes_clients(
+        kubeconfig_path,
+        use_in_cluster_config=resolved_settings.use_in_cluster_config,
+    )
+
+    namespace = resolved_settings.image_prepull_namespace
+    if not _namespace_exists(clients, namespace):
+        namespace_manifest = {
+            "apiVersion": "v1",
+            "kind": "Namespace",
+            "metadata": {"name": namespace},
+        }
+        _apply_manifest(clients, namespace_manifest, namespace=namespace)
+        _wait_for_namespace(
+            clients,
+            namespace,
+            resolved_settings.namespace_wait_timeout_seconds,
+        )
+
+    manifest_dir = Path(__file__).parent / "k8s"
+    for manifest in _load_yaml_documents(
+        manifest_dir / resolved_settings.image_prepull_manifest_name
+    ):
+        if manifest.get("kind") == "DaemonSet":
+            manifest = _prepare_prepull_manifest(manifest, resolved_settings)
+            _apply_daemon_set(clients, manifest, namespace)
+        else:
+            manifest.setdefault("metadata", {})["namespace"] = namespace
+            _apply_manifest(clients, manifest, namespace=namespace)
+
+    return True
@@ -0,0 +1,250 @@
+"""
+Elect one API process to run the background controllers, using a Lease.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, List
+
+from kubernetes import client
+from kubernetes.client import exceptions as k8s_exceptions
+
+from api.config.rexec_settings import RexecSettings
+
+from .create_rexec_server_resources import (
+    KubernetesClients,
+    _load_kubernetes_clients,
+    _resolve_kubeconfig_path,
+)
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY_SECONDS = 2
+# Namespace of the pod this process runs in, mounted with its service account
+POD_NAMESPACE_PATH = Path("/var/run/secrets/kubernetes.io/serviceaccount/namespace")
+
+
+def _host_lease_name() -> str:
+    """Name a Lease after this host, as a valid Kubernetes object name."""
+    host = re.sub(r"[^a-z0-9-]+", "-", socket.gethostname().lower()).strip("-")
+    return f"rexec-api-leader-{host}"[:63].rstrip("-")
+
+
+class LeaderElector:
+    """
+    Acquire and renew a ``coordination.k8s.io`` Lease, calling
+    ``on_started_leading`` when this process becomes the holder and
+    ``on_stopped_leading`` when it loses or gives up the lease.
+
+    Expiry is judged by how long the lease has gone unchanged on this process's
+    monotonic clock, not by its ``renewTime``, so clock skew between hosts
+    cannot cause two leaders.
+    """
+
+    def __init__(
+        self,
+        settings: RexecSettings,
+        stop_event: threading.Event,
+        on_started_leading: Callable[[], None],
+        on_stopped_leading: Callable[[], None],
+    ) -> None:
+        self.settings = settings
+        self.stop_event = stop_event
+        self.on_started_leading = on_started_leading
+        self.on_stopped_leading = on_stopped_leading
+        self.identity = f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_name = settings.leader_election_lease_name or _host_lease_name()
+        self.is_leader = False
+        self._observed_version: str | None = None
+        self._observed_at = 0.0
+        self._renewed_at = 0.0
+        # Looked up on first use; empty when the pod cannot own the Lease
+        self._owner_references: List[client.V1OwnerReference] | None = None
+
+    @property
+    def _lease_duration(self) -> int:
+        return self.settings.leader_election_lease_duration_seconds
+
+    def run(self) -> None:
+        """Campaign for the lease until the stop event is set, then release it."""
+        clients: KubernetesClients | None = None
+        while not self.stop_event.is_set():
+            try:
+                if clients is None:
+                    kubeconfig_path = _resolve_kubeconfig_path(self.settings)
+                    clients = _load_kubernetes_clients(
+                        kubeconfig_path,
+                        use_in_cluster_config=self.settings.use_in_cluster_config,
+                    )
+                leading = self._try_acquire_or_renew(clients)
+            except Exception as exc:  # noqa: BLE001 - keep campaigning
+                logger.warning("Leader election attempt failed: %s", exc)
+                # Step down before the lease can expire for the other candidates
+                leading = (
+                    self.is_leader
+                    and time.monotonic() - self._renewed_at < self._lease_duration * 2 / 3
+                )
+
+            self._set_leading(leading, clients)
+            self.stop_event.wait(
+                self._lease_duration / 3 if self.is_leader else RETRY_DELAY_SECONDS
+            )
+
+        if self.is_leader:
+            self._set_leading(False, clients)
+            if clients is not None:
+                self._release(clients)
+
+    def _set_leading(self, leading: bool, clients: KubernetesClients | None) -> None:
+        if leading == self.is_leader:
+            return
+        self.is_leader = leading
+        if leading:
+            logger.info("Acquired leader lease", extra={"identity": self.identity})
+            try:
+                self.on_started_leading()
+            except Exception as exc:  # noqa: BLE001 - let another process lead
+                logger.warning("Could not start leading, releasing the lease: %s", exc)
+                self.is_leader = False
+                if clients is not None:
+                    self._release(clients)
+        else:
+            logger.info("Lost leader lease", extra={"identity": self.identity})
+            self.on_stopped_leading()
+
+    def _try_acquire_or_renew(self, clients: KubernetesClients) -> bool:
+        """Return whether this process holds the lease after one attempt."""
+        name = self.lease_name
+        namespace = self.settings.leader_election_namespace
+        now = datetime.now(timezone.utc)
+
+        try:
+            lease = clients.coordination_v1.read_namespaced_lease(name, namespace)
+        except k8s_exceptions.ApiException as exc:
+            if exc.status != 404:
+                raise
+            lease = client.V1Lease(
+                metadata=client.V1ObjectMeta(
+                    name=name,
+                    namespace=namespace,
+                    owner_references=self._pod_owner_references(clients),
+                ),
+                spec=client.V1LeaseSpec(
+                    holder_identity=self.identity,
+                    lease_duration_seconds=self._lease_duration,
+                    acquire_time=now,
+                    renew_time=now,
+                    lease_transitions=0,
+                ),
+            )
+            try:
+                created = clients.coordination_v1.create_namespaced_lease(namespace, lease)
+            except k8s_exceptions.ApiException as create_exc:
+                if create_exc.status == 409:  # another process created it first
+                    return False
+                raise
+            self._observe(created)
+            return True
+
+        if lease.metadata.resource_version != self._observed_version:
+            self._observe(lease)
+
+        spec = lease.spec
+        holder = spec.holder_identity
+        if holder != self.identity:
+            lease_duration = spec.lease_duration_seconds or self._lease_duration
+            if holder and time.monotonic() - self._observed_at < lease_duration:
+                return False
+            # Take over a released or expired lease
+            spec.acquire_time = now
+            spec.lease_transitions = (spec.lease_transitions or 0) + 1
+        spec.holder_identity = self.identity
+        spec.lease_duration_seconds = self._lease_duration
+        spec.renew_time = now
+
+        try:
+            updated = clients.coordination_v1.replace_namespaced_lease(name, namespace, lease)
+        except k8s_exceptions.ApiException as exc:
+            if exc.status == 409:  # the lease changed since it was read
+                return False
+            raise
+        self._observe(updated)
+        return True
+
+    def _pod_owner_references(
+        self, clients: KubernetesClients
+    ) -> List[client.V1OwnerReference] | None:
+        """
+        Make this process's pod own the Lease, so Kubernetes deletes the
+        per-host Lease together with the pod. Only possible in-cluster, with
+        the Lease in the pod's own namespace.
+        """
+        if self._owner_references is not None:
+            return self._owner_references or None
+        self._owner_references = []
+        if not self.settings.use_in_cluster_config:
+            return None
+
+        namespace = self.settings.leader_election_namespace
+        try:
+            pod_namespace = POD_NAMESPACE_PATH.read_text(encoding="utf-8").strip()
+            if pod_namespace != namespace:
+                logger.warning(
+                    "Leader lease is not in the pod's namespace '%s'; it will outlive the pod",
+                    pod_namespace,
+                )
+                return None
+            pod = clients.core_v1.read_namespaced_pod(socket.gethostname(), namespace)
+        except (OSError, k8s_exceptions.ApiException) as exc:
+            logger.warning("Could not find this pod to own the leader lease: %s", exc)
+            return None
+
+        self._owner_references = [
+            client.V1OwnerReference(
+                api_version="v1",
+                kind="Pod",
+                name=pod.metadata.name,
+                uid=pod.metadata.uid,
+            )
+        ]
+        return self._owner_references
+
+    def _observe(self, lease: client.V1Lease) -> None:
+        self._observed_version = lease.metadata.resource_version
+        self._observed_at = time.monotonic()
+        if lease.spec.holder_identity == self.identity:
+            self._renewed_at = self._observed_at
+
+    def _release(self, clients: KubernetesClients) -> None:
+        """Clear the holder so another process can take over immediately."""
+        name = self.lease_name
+        namespace = self.settings.leader_election_namespace
+        try:
+            lease = clients.coordination_v1.read_namespaced_lease(name, namespace)
+            if lease.spec.holder_identity != self.identity:
+                return
+            lease.spec.holder_identity = None
+            lease.spec.lease_duration_seconds = 1
+            lease.spec.renew_time = datetime.now(timezone.utc)
+            clients.coordination_v1.replace_namespaced_lease(name, namespace, lease)
+        except k8s_exceptions.ApiException as exc:
+            logger.warning("Failed to release leader lease: %s", exc)
+
+
+def run_leader_election(
+    stop_event: threading.Event,
+    settings: RexecSettings,
+    *,
+    on_started_leading: Callable[[], None],
+    on_stopped_leading: Callable[[], None],
+) -> None:
+    """Campaign for the leader lease until ``stop_event`` is set."""
+    LeaderElector(settings, stop_event, on_started_leading, on_stopped_leading).run()
@@ -0,0 +1,162 @@
+"""
+Keep the local provisioning state store in sync with the cluster.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Dict, Tuple
+
+from kubernetes.client import exceptions as k8s_exceptions
+
+from api.config.rexec_settings import RexecSettings, rexec_settings
+
+from .create_rexec_server_resources import (
+    RexecDeploymentError,
+    _apply_network_policies,
+    _load_kubernetes_clients,
+    _resolve_kubeconfig_path,
+    create_rexec_server_resources,
+)
+from .state_store import (
+    INTERRUPTED_PHASES,
+    PHASE_CREATED,
+    PHASE_MISSING,
+    PHASE_RUNNING,
+    PHASE_STOPPED,
+    PROVISIONED_PHASES,
+    get_state_store,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _container_env_value(deployment, container_name: str, env_name: str) -> str | None:
+    """Read a literal env var from the named container of a deployment."""
+    for container in deployment.spec.template.spec.containers or []:
+        if container.name != container_name:
+            continue
+        for item in container.env or []:
+            if item.name == env_name:
+                return item.value
+    return None
+
+
+def _container_python_version(deployment, container_name: str) -> str:
+    """Derive the Python version from the ``python:<version>`` image tag."""
+    for container in deployment.spec.template.spec.containers or []:
+        if container.name == container_name and container.image:
+            return container.image.rpartition(":")[2]
+    return ""
+
+
+def reconcile_state(*, settings: RexecSettings | None = None) -> None:
+    """
+    Update recorded phases from the Rexec deployments present in the cluster.
+
+    Deployments the store does not know about yet are adopted, records
+    whose deployment has disappeared are marked as missing, and shard
+    namespaces get their NetworkPolicy back if it was deleted.
+    """
+    resolved_settings = settings or rexec_settings
+    store = get_state_store(resolved_settings)
+    kubeconfig_path = _resolve_kubeconfig_path(resolved_settings)
+    clients = _load_kubernetes_clients(
+        kubeconfig_path,
+        use_in_cluster_config=resolved_settings.use_in_cluster_config,
+    )
+
+    listed_at = time.time()
+    try:
+        deployments = clients.apps_v1.list_deployment_for_all_namespaces(
+            label_selector="digest",
+        )
+    except k8s_exceptions.ApiException as exc:
+        raise RexecDeploymentError(f"Failed to list Rexec deployments: {exc}") from exc
+
+    # Keyed by user as well as digest: shared namespaces hold many users' servers
+    observed: Dict[Tuple[str, str, str], str] = {}
+    for deployment in deployments.items:
+        namespace = deployment.metadata.namespace
+        digest = (deployment.metadata.labels or {}).get("digest")
+        if not digest or not namespace.startswith(resolved_settings.namespace_prefix):
+            continue
+
+        user_id = _container_env_value(
+            deployment, resolved_settings.container_name, "REXEC_USER_ID"
+        )
+        if not user_id:
+            continue
+
+        phase = PHASE_RUNNING if deployment.status.available_replicas else PHASE_CREATED
+        observed[(namespace, digest, user_id)] = phase
+
+        record = store.get(user_id, digest)
+        if record is None:
+            store.record(
+                user_id=user_id,
+                digest=digest,
+                namespace=namespace,
+                group_id=None,
+                python_version=_container_python_version(
+                    deployment, resolved_settings.container_name
+                ),
+                requirements=[],
+                phase=phase,
+            )
+        elif record.phase in PROVISIONED_PHASES + (PHASE_MISSING,) and record.phase != phase:
+            store.set_phase(user_id, digest, phase)
+
+    # Restore the isolation of shard namespaces whose NetworkPolicy was removed
+    shared_prefix = f"{resolved_settings.namespace_prefix}shared-"
+    shared_namespaces = {key[0] for key in observed if key[0].startswith(shared_prefix)}
+    for namespace in sorted(shared_namespaces):
+        try:
+            _apply_network_policies(clients, namespace, resolved_settings)
+        except RexecDeploymentError as exc:
+            logger.warning("Failed to re-apply NetworkPolicy in '%s': %s", namespace, exc)
+
+    # A stopped server whose deployment was deleted may be spawned again
+    for record in store.list_by_phase(PROVISIONED_PHASES + (PHASE_STOPPED,)):
+        # Records written after the listing may not be visible in it yet
+        if record.updated_at >= listed_at:
+            continue
+        if (record.namespace, record.digest, record.user_id) not in observed:
+            store.set_phase(
+                record.user_id,
+                record.digest,
+                PHASE_MISSING,
+                "Deployment no longer present in the cluster.",
+            )
+
+
+def resume_interrupted_provisioning(*, settings: RexecSettings | None = None) -> int:
+    """
+    Re-run provisioning for records left in flight by an API process that has
+    since exited. Records still owned by a running worker are left alone.
+
+    Returns the number of records that were resumed successfully.
+    """
+    resolved_settings = settings or rexec_settings
+    store = get_state_store(resolved_settings)
+
+    resumed = 0
+    for record in store.list_by_phase(INTERRUPTED_PHASES):
+        if store.owner_alive(record.owner):
+            continue
+        try:
+            create_rexec_server_resources(
+                record.group_id,
+                record.user_id,
+                record.requirements,
+                settings=resolved_settings,
+            )
+            resumed += 1
+        except Exception as exc:  # noqa: BLE001 - failure is recorded on the record
+            logger.warning(
+                "Failed to resume provisioning: %s",
+                exc,
+                extra={"user": record.user_id, "digest": record.digest},
+            )
+    return resumed
@@ -0,0 +1,374 @@
+"""
+Local persistent record of provisioned Rexec servers.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, TextIO
+
+from api.config.rexec_settings import RexecSettings, rexec_settings
+
+# Provisioning phases, in the order a healthy request moves through them
+PHASE_PROVISIONING = "Provisioning"
+PHASE_CREATED = "Created"
+PHASE_RUNNING = "Running"
+# Set by the reconciler when a recorded deployment is gone from the cluster
+PHASE_MISSING = "Missing"
+PHASE_FAILED = "Failed"
+# Set by the crash-loop watcher after scaling a failing deployment to zero
+PHASE_STOPPED = "Stopped"
+
+# Phases a restarted API process should pick up again
+INTERRUPTED_PHASES = (PHASE_PROVISIONING,)
+# Phases that mean the deployment exists in the cluster
+PROVISIONED_PHASES = (PHASE_CREATED, PHASE_RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rexec_servers (
+    user_id TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    namespace TEXT NOT NULL,
+    group_id TEXT,
+    python_version TEXT NOT NULL,
+    requirements TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    message TEXT,
+    failure_log TEXT,
+    owner TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user_id, digest)
+);
+CREATE INDEX IF NOT EXISTS rexec_servers_phase ON rexec_servers (phase);
+CREATE INDEX IF NOT EXISTS rexec_servers_namespace ON rexec_servers (namespace, digest);
+CREATE TABLE IF NOT EXISTS rexec_resolutions (
+    resolution_key TEXT PRIMARY KEY,
+    python_version TEXT NOT NULL,
+    lock TEXT,
+    error TEXT,
+    created_at REAL NOT NULL
+);
+"""
+
+# Columns added after the first release, applied to existing databases
+_MIGRATIONS = {
+    "rexec_servers": {"failure_log": "TEXT", "owner": "TEXT"},
+}
+
+_COLUMNS = (
+    "user_id, digest, namespace, group_id, python_version, requirements, "
+    "phase, message, failure_log, owner, created_at, updated_at"
+)
+
+
+@dataclass
+class ServerRecord:
+    """A provisioned (or in-flight) Rexec server as recorded locally."""
+
+    user_id: str
+    digest: str
+    namespace: str
+    group_id: str | None
+    python_version: str
+    requirements: List[str]
+    phase: str
+    message: str | None
+    failure_log: str | None
+    # API process that last wrote the record, see ProvisioningStateStore.owner
+    owner: str | None
+    created_at: float
+    updated_at: float
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "ServerRecord":
+        return cls(
+            user_id=row["user_id"],
+            digest=row["digest"],
+            namespace=row["namespace"],
+            group_id=row["group_id"],
+            python_version=row["python_version"],
+            requirements=json.loads(row["requirements"]),
+            phase=row["phase"],
+            message=row["message"],
+            failure_log=row["failure_log"],
+            owner=row["owner"],
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+        )
+
+
+@dataclass
+class ResolutionRecord:
+    """A cached pre-flight resolution: the pinned lock, or why it failed."""
+
+    resolution_key: str
+    python_version: str
+    lock: List[str] | None
+    error: str | None
+    created_at: float
+
+
+class ProvisioningStateStore:
+    """
+    SQLite-backed store of Rexec server records keyed by user and digest.
+
+    The database runs in WAL mode so every API worker process on the host can
+    share it: readers never block the writer, and writers wait for each other.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = str(Path(path).expanduser())
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._owner_dir = Path(f"{self.path}.owners")
+        self._owner: str | None = None
+        self._owner_pid: int | None = None
+        self._owner_handle: TextIO | None = None
+        self._owner_lock = threading.Lock()
+        with self._connection() as connection:
+            # Persistent for the database file; must run outside a transaction
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            for table, columns in _MIGRATIONS.items():
+                existing = {
+                    row["name"]
+                    for row in connection.execute(f"PRAGMA table_info({table})")
+                }
+                for column, column_type in columns.items():
+                    if column not in existing:
+                        connection.execute(
+                            f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"
+                        )
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Open a short-lived connection; commits on success."""
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        # WAL keeps the database consistent with NORMAL; only the last
+        # commits may be lost on power failure, never on a process crash
+        connection.execute("PRAGMA synchronous=NORMAL")
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @property
+    def owner(self) -> str:
+        """
+        Identify this process as the writer of a record. The process holds an
+        advisory lock on a file named after the token for as long as it lives,
+        so other workers can tell whether the record's writer is still running.
+        """
+        with self._owner_lock:
+            # A forked worker shares its parent's lock and needs its own token
+            if self._owner is None or self._owner_pid != os.getpid():
+                token = f"{socket.gethostname()}-{os.getpid()}-{secrets.token_hex(4)}"
+                self._owner_dir.mkdir(parents=True, exist_ok=True)
+                handle = open(self._owner_dir / f"{token}.lock", "w", encoding="utf-8")
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._owner, self._owner_pid, self._owner_handle = token, os.getpid(), handle
+            return self._owner
+
+    def owner_alive(self, owner: str | None) -> bool:
+        """Return whether the process that wrote ``owner`` is still running."""
+        if not owner:
+            return False
+        if owner == self.owner:
+            return True
+        lock_path = self._owner_dir / f"{owner}.lock"
+        try:
+            handle = open(lock_path, "a", encoding="utf-8")
+        except FileNotFoundError:
+            return False
+        with handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            lock_path.unlink(missing_ok=True)
+        return False
+
+    def record(
+        self,
+        *,
+        user_id: str,
+        digest: str,
+        namespace: str,
+        group_id: str | None,
+        python_version: str,
+        requirements: Sequence[str],
+        phase: str,
+        message: str | None = None,
+        failure_log: str | None = None,
+    ) -> None:
+        """Insert a record, or move an existing one to the given phase."""
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                f"""
+                INSERT INTO rexec_servers ({_COLUMNS})
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, digest) DO UPDATE SET
+                    namespace = excluded.namespace,
+                    group_id = excluded.group_id,
+                    python_version = excluded.python_version,
+                    requirements = excluded.requirements,
+                    phase = excluded.phase,
+                    message = excluded.message,
+                    failure_log = excluded.failure_log,
+                    owner = excluded.owner,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    user_id,
+                    digest,
+                    namespace,
+                    group_id,
+                    python_version,
+                    json.dumps(list(requirements)),
+                    phase,
+                    message,
+                    failure_log,
+                    self.owner,
+                    now,
+                    now,
+                ),
+            )
+
+    def set_phase(
+        self,
+        user_id: str,
+        digest: str,
+        phase: str,
+        message: str | None = None,
+        failure_log: str | None = None,
+    ) -> None:
+        """Update the phase, message and failure log of an existing record."""
+        with self._connection() as connection:
+            connection.execute(
+                """
+                UPDATE rexec_servers
+                SET phase = ?, message = ?, failure_log = ?, updated_at = ?
+                WHERE user_id = ? AND digest = ?
+                """,
+                (phase, message, failure_log, time.time(), user_id, digest),
+            )
+
+    def get(self, user_id: str, digest: str) -> ServerRecord | None:
+        """Return the record for a user's requirement digest, if any."""
+        with self._connection() as connection:
+            row = connection.execute(
+                f"SELECT {_COLUMNS} FROM rexec_servers WHERE user_id = ? AND digest = ?",
+                (user_id, digest),
+            ).fetchone()
+        return ServerRecord.from_row(row) if row else None
+
+    def list_for_user(self, user_id: str) -> List[ServerRecord]:
+        """Return all records for a user, newest first."""
+        with self._connection() as connection:
+            rows = connection.execute(
+                f"""
+                SELECT {_COLUMNS} FROM rexec_servers
+                WHERE user_id = ? ORDER BY updated_at DESC
+                """,
+                (user_id,),
+            ).fetchall()
+        return [ServerRecord.from_row(row) for row in rows]
+
+    def list_by_phase(self, phases: Iterable[str]) -> List[ServerRecord]:
+        """Return all records currently in one of the given phases."""
+        phases = list(phases)
+        if not phases:
+            return []
+        placeholders = ", ".join("?" for _ in phases)
+        with self._connection() as connection:
+            rows = connection.execute(
+                f"""
+                SELECT {_COLUMNS} FROM rexec_servers
+                WHERE phase IN ({placeholders}) ORDER BY updated_at
+                """,
+                phases,
+            ).fetchall()
+        return [ServerRecord.from_row(row) for row in rows]
+
+    def record_resolution(
+        self,
+        resolution_key: str,
+        python_version: str,
+        lock: Sequence[str] | None,
+        error: str | None,
+    ) -> None:
+        """Cache the outcome of a pre-flight resolution."""
+        with self._connection() as connection:
+            connection.execute(
+                """
+                INSERT OR REPLACE INTO rexec_resolutions
+                    (resolution_key, python_version, lock, error, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (
+                    resolution_key,
+                    python_version,
+                    json.dumps(list(lock)) if lock is not None else None,
+                    error,
+                    time.time(),
+                ),
+            )
+
+    def get_resolution(
+        self,
+        resolution_key: str,
+        *,
+        max_failure_age_seconds: float,
+    ) -> ResolutionRecord | None:
+        """
+        Return a cached resolution. Failed resolutions expire after
+        ``max_failure_age_seconds`` so fixes published to the index are picked up.
+        """
+        with self._connection() as connection:
+            row = connection.execute(
+                """
+                SELECT resolution_key, python_version, lock, error, created_at
+                FROM rexec_resolutions WHERE resolution_key = ?
+                """,
+                (resolution_key,),
+            ).fetchone()
+        if row is None:
+            return None
+        if row["lock"] is None and time.time() - row["created_at"] > max_failure_age_seconds:
+            return None
+        return ResolutionRecord(
+            resolution_key=row["resolution_key"],
+            python_version=row["python_version"],
+            lock=json.loads(row["lock"]) if row["lock"] is not None else None,
+            error=row["error"],
+            created_at=row["created_at"],
+        )
+
+
+_stores: Dict[str, ProvisioningStateStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_state_store(settings: RexecSettings | None = None) -> ProvisioningStateStore:
+    """Return the process-wide store for the configured path."""
+    resolved_settings = settings or rexec_settings
+    path = resolved_settings.state_store_path
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = ProvisioningStateStore(path)
+            _stores[path] = store
+    return store
@@ -0,0 +1,170 @@
+"""
+Structured, non-blocking logging with credential redaction.
+"""
+
+from __future__ import annotations
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from api.config.logging_settings import LoggingSettings, logging_settings
+from api.services.tracing import current_trace_id
+
+REDACTED = "[REDACTED]"
+
+# Values that must never reach the logs, even when a caller formats them in
+_SECRET_PATTERNS = (
+    # JSON Web Tokens
+    re.compile(r"eyJ[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]*"),
+    re.compile(r"(?i)(bearer\s+)[^\s'\",]+"),
+    re.compile(
+        r"(?i)((?:access_|refresh_|id_)?token|authorization|password|secret)"
+        r"(['\"]?\s*[:=]\s*['\"]?)[^\s'\",}]+"
+    ),
+)
+_SENSITIVE_KEYS = re.compile(r"(?i)token|authorization|password|secret")
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(
+    vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None))
+) | {"message", "asctime", "trace_id"}
+
+
+def redact(text: str) -> str:
+    """Mask bearer tokens, JWTs and ``token=...`` style secrets in text."""
+    text = _SECRET_PATTERNS[0].sub(REDACTED, text)
+    text = _SECRET_PATTERNS[1].sub(rf"\g<1>{REDACTED}", text)
+    return _SECRET_PATTERNS[2].sub(rf"\g<1>\g<2>{REDACTED}", text)
+
+
+def _redact_value(key: str, value: Any) -> Any:
+    if _SENSITIVE_KEYS.search(key):
+        return REDACTED
+    if isinstance(value, str):
+        return redact(value)
+    return value
+
+
+class RedactingFilter(logging.Filter):
+    """
+    Render and redact the message before the record leaves the calling thread,
+    and tag it with the active trace id.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.msg = redact(record.getMessage())
+        record.args = None
+        for key, value in list(vars(record).items()):
+            if key not in _RECORD_ATTRIBUTES:
+                setattr(record, key, _redact_value(key, value))
+        record.trace_id = current_trace_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of DEBUG/INFO records; warnings and above always pass."""
+
+    def __init__(self, ratio: float) -> None:
+        super().__init__()
+        self.ratio = ratio
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.ratio >= 1.0:
+            return True
+        return random.random() < self.ratio
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "trace_id", None):
+            payload["trace_id"] = record.trace_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                payload[key] = value
+        return json.dumps(payload, default=str)
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Drop records instead of blocking when the listener falls behind."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The message was already rendered and redacted by RedactingFilter;
+        # tracebacks are rendered here since exc_info cannot cross the queue
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exception = redact(logging.Formatter().formatException(record.exc_info))
+            record.exc_info = None
+            record.exc_text = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def _parse_levels(levels: str) -> Dict[str, str]:
+    overrides: Dict[str, str] = {}
+    for item in levels.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            overrides[name.strip()] = level.strip().upper()
+    return overrides
+
+
+def configure_logging(settings: LoggingSettings | None = None) -> None:
+    """
+    Route the ``api`` loggers through a queue so request threads never block on
+    stdout; a single listener thread formats and writes the records.
+    """
+    global _listener
+    resolved_settings = settings or logging_settings
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if resolved_settings.json_format:
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+
+    log_queue: queue.Queue = queue.Queue(maxsize=resolved_settings.queue_size)
+    queue_handler = _NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(resolved_settings.sample_ratio))
+    queue_handler.addFilter(RedactingFilter())
+
+    logger = logging.getLogger("api")
+    logger.handlers = [queue_handler]
+    logger.setLevel(resolved_settings.level.upper())
+    logger.propagate = False
+    for name, level in _parse_levels(resolved_settings.levels).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,336 @@
+"""
+Lightweight per-request phase tracing with pluggable span exporters.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import requests
+
+from api.config.tracing_settings import TracingSettings, tracing_settings
+
+EXPORT_QUEUE_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    """A timed phase of a request."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    duration_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    _started: int = field(default_factory=time.perf_counter_ns, repr=False)
+
+    def finish(self) -> None:
+        self.duration_ns = time.perf_counter_ns() - self._started
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration_ns / 1_000_000
+
+
+class Trace:
+    """All spans recorded for one request, plus request-wide attributes."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]) -> None:
+        self.trace_id = secrets.token_hex(16)
+        self.attributes: Dict[str, Any] = {}
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self.root = self.start_span(name, None, attributes)
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span],
+        attributes: Dict[str, Any],
+    ) -> Span:
+        span = Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+            attributes=dict(attributes),
+        )
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @property
+    def failed(self) -> bool:
+        return any(span.error for span in self.spans)
+
+    def server_timing(self) -> str:
+        """
+        Summarize the request's phases as a ``Server-Timing`` value. Repeated
+        phases are summed; nested phases are also counted in their parents.
+        """
+        phases: Dict[str, float] = {}
+        for span in self.spans:
+            if span is self.root:
+                continue
+            metric = re.sub(r"[^A-Za-z0-9_.-]", "_", span.name)
+            phases[metric] = phases.get(metric, 0.0) + span.duration_ms
+
+        entries = [f"{metric};dur={duration:.1f}" for metric, duration in phases.items()]
+        entries.append(f"total;dur={self.root.duration_ms:.1f}")
+        return ", ".join(entries)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("rexec_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("rexec_span", default=None)
+
+
+class JsonlSpanExporter:
+    """
+    Append spans as JSON lines to a local file for offline analysis, keeping
+    one rolled-over file so the disk use stays bounded.
+    """
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _roll_over(self) -> None:
+        try:
+            if os.path.getsize(self.path) >= self.max_bytes:
+                os.replace(self.path, f"{self.path}.1")
+        except FileNotFoundError:
+            pass
+
+    def export(self, trace: Trace) -> None:
+        lines = []
+        for span in trace.spans:
+            lines.append(
+                json.dumps(
+                    {
+                        "trace_id": span.trace_id,
+                        "span_id": span.span_id,
+                        "parent_id": span.parent_id,
+                        "name": span.name,
+                        "start_unix_ns": span.start_ns,
+                        "duration_ms": round(span.duration_ms, 3),
+                        "attributes": {**trace.attributes, **span.attributes},
+                        "error": span.error,
+                    },
+                    default=str,
+                )
+            )
+        with self._lock:
+            self._roll_over()
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write("\n".join(lines) + "\n")
+
+
+class OtlpHttpSpanExporter:
+    """Send spans to an OTLP/HTTP collector using the JSON encoding."""
+
+    def __init__(self, endpoint: str, service_name: str, timeout_seconds: float) -> None:
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout_seconds = timeout_seconds
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> dict:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def export(self, trace: Trace) -> None:
+        spans = []
+        for span in trace.spans:
+            attributes = {**trace.attributes, **span.attributes}
+            otlp_span = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                # SPAN_KIND_SERVER for the request, SPAN_KIND_INTERNAL otherwise
+                "kind": 2 if span.parent_id is None else 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.start_ns + span.duration_ns),
+                "attributes": [self._attribute(k, v) for k, v in attributes.items()],
+                "status": (
+                    {"code": 2, "message": span.error} if span.error else {"code": 1}
+                ),
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            spans.append(otlp_span)
+
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [self._attribute("service.name", self.service_name)]
+                    },
+                    "scopeSpans": [{"scope": {"name": "api.services.tracing"}, "spans": spans}],
+                }
+            ]
+        }
+        response = requests.post(self.endpoint, json=payload, timeout=self.timeout_seconds)
+        response.raise_for_status()
+
+
+def _build_exporter(settings: TracingSettings):
+    if settings.exporter == "jsonl":
+        return JsonlSpanExporter(settings.jsonl_path, settings.jsonl_max_bytes)
+    if settings.exporter == "otlp":
+        return OtlpHttpSpanExporter(
+            settings.otlp_endpoint,
+            settings.service_name,
+            settings.otlp_timeout_seconds,
+        )
+    return None
+
+
+_export_queue: "queue.Queue[Trace]" = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+_exporter = None
+_export_thread: Optional[threading.Thread] = None
+_export_lock = threading.Lock()
+
+
+def _export_worker() -> None:
+    """Export queued traces off the request path."""
+    while True:
+        trace = _export_queue.get()
+        try:
+            _exporter.export(trace)
+        except Exception as exc:  # noqa: BLE001 - tracing must never break requests
+            logger.warning("Failed to export trace %s: %s", trace.trace_id, exc)
+
+
+def _submit(trace: Trace, settings: TracingSettings) -> None:
+    """Queue a finished trace for export, dropping it when the queue is full."""
+    global _exporter, _export_thread
+    with _export_lock:
+        if _export_thread is None:
+            _exporter = _build_exporter(settings)
+            if _exporter is None:
+                return
+            _export_thread = threading.Thread(
+                target=_export_worker,
+                name="rexec-trace-exporter",
+                daemon=True,
+            )
+            _export_thread.start()
+    try:
+        _export_queue.put_nowait(trace)
+    except queue.Full:
+        pass
+
+
+def _should_export(trace: Trace, settings: TracingSettings) -> bool:
+    """Keep slow and failed requests, and a random sample of the rest."""
+    if trace.failed or trace.root.duration_ms >= settings.slow_request_threshold_ms:
+        return True
+    return random.random() < settings.sample_ratio
+
+
+@contextmanager
+def start_trace(
+    name: str,
+    *,
+    settings: TracingSettings | None = None,
+    **attributes: Any,
+) -> Iterator[Trace]:
+    """Trace one request; the trace is sampled and exported when it finishes."""
+    resolved_settings = settings or tracing_settings
+    trace = Trace(name, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    try:
+        yield trace
+    except BaseException as exc:
+        trace.root.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        trace.root.finish()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        if resolved_settings.exporter != "none" and _should_export(trace, resolved_settings):
+            _submit(trace, resolved_settings)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time a phase of the current request; a no-op outside a trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    current = trace.start_span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        current.finish()
+        _current_span.reset(token)
+
+
+def traced(name: str | None = None, **attributes: Any) -> Callable:
+    """Decorator recording each call of the function as a span."""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__.lstrip("_")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name, **attributes):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def current_trace_id() -> Optional[str]:
+    """Return the id of the active trace, for correlating log lines."""
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+def set_span_attributes(**attributes: Any) -> None:
+    """Attach attributes to the innermost active span."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def annotate_trace(**attributes: Any) -> None:
+    """Attach attributes (e.g. user, digest) to every span of the current trace."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attributes.update(attributes)
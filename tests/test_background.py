@@ -0,0 +1,36 @@
+import threading
+
+import pytest
+
+from api.config.rexec_settings import RexecSettings
+from api.services.rexec_services import background
+
+
+@pytest.fixture
+def controllers(monkeypatch):
+    release = threading.Event()
+
+    def slow_to_stop(settings, stop_event):
+        stop_event.wait()
+        release.wait(5)
+
+    for name in ("_run_image_prepull", "_run_state_reconciler", "_run_crashloop_watcher"):
+        monkeypatch.setattr(background, name, slow_to_stop)
+    yield release
+    release.set()
+    background._stop_controllers()
+
+
+def test_new_term_waits_for_the_previous_controllers(controllers):
+    settings = RexecSettings(crashloop_watch_enabled=True)
+    background._start_controllers(settings)
+
+    background._stop_controllers(timeout=0.01)
+    assert len(background._controller_threads) == 3
+
+    with pytest.raises(RuntimeError):
+        background._start_controllers(settings, timeout=0.01)
+
+    controllers.set()
+    background._start_controllers(settings)
+    assert len(background._controller_threads) == 3
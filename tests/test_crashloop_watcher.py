@@ -0,0 +1,106 @@
+import threading
+from types import SimpleNamespace
+
+from api.config.rexec_settings import RexecSettings
+from api.services.rexec_services.crashloop_watcher import CrashLoopWatcher
+from api.services.rexec_services.state_store import PHASE_STOPPED, get_state_store
+
+
+def _pod(resource_version, reason, restart_count=0):
+    waiting = SimpleNamespace(reason=reason, message=None) if reason else None
+    return SimpleNamespace(
+        metadata=SimpleNamespace(
+            namespace="rexec-server-user",
+            name="rexec-server-abc",
+            resource_version=resource_version,
+        ),
+        status=SimpleNamespace(
+            container_statuses=[
+                SimpleNamespace(
+                    name="rexec-server",
+                    restart_count=restart_count,
+                    state=SimpleNamespace(waiting=waiting),
+                )
+            ]
+        ),
+    )
+
+
+def _watcher(threshold=3):
+    watcher = CrashLoopWatcher(
+        RexecSettings(crashloop_failure_threshold=threshold),
+        threading.Event(),
+    )
+    stopped = []
+    watcher._stop_server = lambda clients, pod, reason, detail: stopped.append(reason)
+    return watcher, stopped
+
+
+def test_image_pull_failures_count_pull_attempts():
+    watcher, stopped = _watcher()
+    events = [
+        ("1", "ErrImagePull"),
+        ("2", "ImagePullBackOff"),
+        ("2", "ImagePullBackOff"),  # replayed after a watch reconnect
+        ("3", "ErrImagePull"),
+        ("4", "ImagePullBackOff"),
+    ]
+    for version, reason in events:
+        watcher._inspect_pod(None, _pod(version, reason))
+
+    assert stopped == []
+
+    watcher._inspect_pod(None, _pod("5", "ErrImagePull"))
+    assert stopped == ["ErrImagePull"]
+
+
+def test_invalid_image_name_stops_at_once():
+    watcher, stopped = _watcher()
+
+    watcher._inspect_pod(None, _pod("1", "InvalidImageName"))
+
+    assert stopped == ["InvalidImageName"]
+
+
+def test_crash_loops_use_restart_count():
+    watcher, stopped = _watcher()
+
+    watcher._inspect_pod(None, _pod("1", "CrashLoopBackOff", restart_count=2))
+    watcher._inspect_pod(None, _pod("2", "CrashLoopBackOff", restart_count=3))
+
+    assert stopped == ["CrashLoopBackOff"]
+
+
+def test_stopping_an_unrecorded_server_keeps_the_failure(tmp_path):
+    settings = RexecSettings(state_store_path=str(tmp_path / "state.sqlite3"))
+    watcher = CrashLoopWatcher(settings, threading.Event())
+    pod = _pod("1", "CrashLoopBackOff", restart_count=3)
+    pod.metadata.labels = {"digest": "abc123", "rexec-user": "key"}
+    pod.spec = SimpleNamespace(
+        containers=[
+            SimpleNamespace(
+                name="rexec-server",
+                image="python:3.11",
+                env=[SimpleNamespace(name="REXEC_USER_ID", value="user-1")],
+            )
+        ]
+    )
+    scaled = []
+    clients = SimpleNamespace(
+        core_v1=SimpleNamespace(read_namespaced_pod_log=lambda **kwargs: "Traceback"),
+        apps_v1=SimpleNamespace(
+            list_namespaced_deployment=lambda **kwargs: SimpleNamespace(
+                items=[SimpleNamespace(metadata=SimpleNamespace(name="rexec-server"))]
+            ),
+            patch_namespaced_deployment_scale=lambda **kwargs: scaled.append(kwargs["name"]),
+        ),
+    )
+
+    watcher._stop_server(clients, pod, "CrashLoopBackOff", "back-off restarting")
+
+    record = get_state_store(settings).get("user-1", "abc123")
+    assert scaled == ["rexec-server"]
+    assert record.phase == PHASE_STOPPED
+    assert record.python_version == "3.11"
+    assert "back-off restarting" in record.message
+    assert record.failure_log == "Traceback"
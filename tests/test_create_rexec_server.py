@@ -0,0 +1,123 @@
+import importlib
+from types import SimpleNamespace
+
+import pytest
+from kubernetes.client import exceptions as k8s_exceptions
+
+from api.config.rexec_settings import RexecSettings
+from api.services.rexec_services.create_rexec_server_resources import (
+    EXISTING_SERVER_MESSAGE,
+    RexecServerStoppedError,
+)
+from api.services.rexec_services.state_store import (
+    PHASE_CREATED,
+    PHASE_STOPPED,
+    get_state_store,
+)
+
+create_module = importlib.import_module(
+    "api.services.rexec_services.create_rexec_server_resources"
+)
+
+
+class FakeAppsApi:
+    """Deployments of one namespace, keyed by name."""
+
+    def __init__(self):
+        self.deployments = {}
+        self.replaced = []
+
+    def list_namespaced_deployment(self, namespace, label_selector):
+        wanted = dict(item.split("=") for item in label_selector.split(","))
+        return SimpleNamespace(
+            items=[
+                deployment
+                for deployment in self.deployments.values()
+                if all(deployment.metadata.labels.get(k) == v for k, v in wanted.items())
+            ]
+        )
+
+    def create_namespaced_deployment(self, namespace, body):
+        name = body["metadata"]["name"]
+        if name in self.deployments:
+            raise k8s_exceptions.ApiException(status=409)
+        self._store(body)
+
+    def read_namespaced_deployment(self, name, namespace):
+        return self.deployments[name]
+
+    def replace_namespaced_deployment(self, name, namespace, body):
+        self.replaced.append(name)
+        self._store(body)
+
+    def patch_namespaced_deployment_scale(self, name, namespace, body):
+        self.deployments[name].spec.replicas = body["spec"]["replicas"]
+
+    def _store(self, body):
+        self.deployments[body["metadata"]["name"]] = SimpleNamespace(
+            metadata=SimpleNamespace(
+                name=body["metadata"]["name"],
+                labels=dict(body["metadata"]["labels"]),
+                resource_version="1",
+            ),
+            spec=SimpleNamespace(replicas=body["spec"]["replicas"]),
+        )
+
+
+@pytest.fixture
+def cluster(tmp_path, monkeypatch):
+    settings = RexecSettings(
+        state_store_path=str(tmp_path / "state.sqlite3"),
+        server_code_version="v1.0.0",
+        resolver_enabled=False,
+    )
+    apps = FakeAppsApi()
+    clients = SimpleNamespace(
+        core_v1=SimpleNamespace(read_namespace=lambda name: None),
+        apps_v1=apps,
+    )
+    monkeypatch.setattr(create_module, "_resolve_kubeconfig_path", lambda settings: None)
+    monkeypatch.setattr(
+        create_module, "_load_kubernetes_clients", lambda path, **kwargs: clients
+    )
+    monkeypatch.setattr(create_module, "_get_cluster_ip", lambda *args: "10.0.0.1")
+    return settings, apps
+
+
+def _spawn(settings, requirements, **kwargs):
+    return create_module.create_rexec_server_resources(
+        "group", "user-1", requirements, settings=settings, **kwargs
+    )
+
+
+def test_new_requirements_replace_the_per_user_deployment(cluster):
+    settings, apps = cluster
+
+    _spawn(settings, ["python==3.11", "numpy"])
+    _spawn(settings, ["python==3.11", "pandas"])
+
+    deployment = apps.deployments["rexec-server"]
+    records = get_state_store(settings).list_for_user("user-1")
+    assert apps.replaced == ["rexec-server"]
+    (pandas,) = [record for record in records if "pandas" in record.requirements]
+    assert deployment.metadata.labels["digest"] == pandas.digest
+    assert {record.phase for record in records} == {PHASE_CREATED}
+
+
+def test_stopped_server_restarts_only_on_retry(cluster):
+    settings, apps = cluster
+    _spawn(settings, ["python==3.11", "numpy"])
+    store = get_state_store(settings)
+    (record,) = store.list_for_user("user-1")
+    apps.deployments["rexec-server"].spec.replicas = 0
+    store.set_phase("user-1", record.digest, PHASE_STOPPED, "CrashLoopBackOff", "log")
+
+    with pytest.raises(RexecServerStoppedError) as excinfo:
+        _spawn(settings, ["python==3.11", "numpy"])
+    assert excinfo.value.log_tail == "log"
+
+    assert _spawn(settings, ["python==3.11", "numpy"], retry_stopped=True) != (
+        EXISTING_SERVER_MESSAGE
+    )
+    assert apps.deployments["rexec-server"].spec.replicas == 1
+    assert store.get("user-1", record.digest).phase == PHASE_CREATED
@@ -0,0 +1,94 @@
+import json
+import subprocess
+
+import pytest
+
+from api.config.rexec_settings import RexecSettings
+from api.services.rexec_services import dependency_resolver
+from api.services.rexec_services.dependency_resolver import (
+    ResolverUnavailableError,
+    resolve_requirements,
+)
+
+
+@pytest.fixture
+def settings():
+    return RexecSettings(resolver_index_url=None)
+
+
+def _fake_pip(monkeypatch, *, install_stderr="", report=None, index_stdout=""):
+    """Answer pip's dry run and ``pip index versions`` calls with canned output."""
+
+    def run(command, **kwargs):
+        if command[3] == "index":
+            return subprocess.CompletedProcess(command, 0, index_stdout, "")
+        if report is not None:
+            report_path = command[command.index("--report") + 1]
+            with open(report_path, "w", encoding="utf-8") as handle:
+                json.dump(report, handle)
+            return subprocess.CompletedProcess(command, 0, "", "")
+        return subprocess.CompletedProcess(command, 1, "", install_stderr)
+
+    monkeypatch.setattr(dependency_resolver.subprocess, "run", run)
+
+
+def test_lock_pins_index_packages_and_keeps_direct_references(monkeypatch, settings):
+    url = "https://example.org/pkgs/tool-1.0-py3-none-any.whl"
+    _fake_pip(
+        monkeypatch,
+        report={
+            "install": [
+                {"metadata": {"name": "numpy", "version": "2.0.0"}},
+                {
+                    "metadata": {"name": "tool", "version": "1.0"},
+                    "is_direct": True,
+                    "download_info": {"url": url},
+                },
+            ]
+        },
+    )
+
+    result = resolve_requirements("3.11", ["numpy", f"tool @ {url}"], settings)
+
+    assert result.lock == ["numpy==2.0.0", f"tool @ {url}"]
+
+
+def test_conflicts_are_reported(monkeypatch, settings):
+    _fake_pip(monkeypatch, install_stderr="ERROR: ResolutionImpossible: conflicting")
+
+    result = resolve_requirements("3.11", ["a==1", "a==2"], settings)
+
+    assert not result.ok
+    assert "ResolutionImpossible" in result.error
+
+
+def test_sdist_only_packages_skip_resolution(monkeypatch, settings):
+    _fake_pip(
+        monkeypatch,
+        install_stderr=(
+            "ERROR: Could not find a version that satisfies the requirement "
+            "docopt==0.6.2 (from versions: none)\n"
+            "ERROR: No matching distribution found for docopt==0.6.2\n"
+        ),
+        index_stdout="docopt (0.6.2)\nAvailable versions: 0.6.2, 0.6.1\n",
+    )
+
+    with pytest.raises(ResolverUnavailableError):
+        resolve_requirements("3.12", ["docopt==0.6.2"], settings)
+
+
+def test_unpublished_versions_are_reported(monkeypatch, settings):
+    _fake_pip(
+        monkeypatch,
+        install_stderr=(
+            "ERROR: Could not find a version that satisfies the requirement "
+            "numpy==0.0.1 (from versions: 2.0.0)\n"
+            "ERROR: No matching distribution found for numpy==0.0.1\n"
+        ),
+        index_stdout="numpy (2.0.0)\nAvailable versions: 2.0.0\n",
+    )
+
+    result = resolve_requirements("3.11", ["numpy==0.0.1"], settings)
+
+    assert not result.ok
+    assert "numpy==0.0.1" in result.error
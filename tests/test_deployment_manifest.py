@@ -0,0 +1,143 @@
+import importlib
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from kubernetes.client import exceptions as k8s_exceptions
+
+from api.config.rexec_settings import RexecSettings
+from api.services.rexec_services.create_rexec_server_resources import (
+    RexecConfigurationError,
+    RexecDeploymentError,
+    _load_yaml_documents,
+    _prepare_deployment_manifest,
+    _server_placement,
+)
+
+create_module = importlib.import_module(
+    "api.services.rexec_services.create_rexec_server_resources"
+)
+
+MANIFEST = (
+    Path(__file__).resolve().parents[1]
+    / "api/services/rexec_services/k8s/rexec-server-deployment.yaml"
+)
+
+
+def _settings(**overrides):
+    return RexecSettings(server_code_version="v1.0.0", **overrides)
+
+
+def _prepare(settings, user_id="user-1", digest="d" * 40, locked=None):
+    manifest = next(iter(_load_yaml_documents(MANIFEST)))
+    return _prepare_deployment_manifest(
+        manifest,
+        _server_placement(user_id, digest, settings),
+        digest,
+        "3.11",
+        ["pyzmq"],
+        ["numpy"],
+        "10.0.0.1",
+        user_id,
+        settings,
+        locked_requirements=locked,
+    )
+
+
+def _command(manifest):
+    return manifest["spec"]["template"]["spec"]["containers"][0]["command"][-1]
+
+
+def test_pod_installs_from_the_resolver_index():
+    settings = _settings(resolver_index_url="https://mirror.example/simple")
+
+    command = _command(_prepare(settings, locked=["numpy==2.0.0", "pyzmq==26.0.0"]))
+
+    assert "pip install --index-url https://mirror.example/simple numpy==2.0.0" in command
+
+
+def test_pod_uses_the_default_index_without_a_mirror():
+    command = _command(_prepare(_settings(), locked=["numpy==2.0.0"]))
+
+    assert "--index-url" not in command
+    assert "pip install numpy==2.0.0;" in command
+
+
+def test_per_user_placement_keeps_the_manifest_name():
+    placement = _server_placement("alice", "d" * 40, _settings())
+
+    assert placement.namespace == "rexec-server-alice"
+    assert placement.deployment_name is None
+    assert not placement.shared
+
+
+def test_shared_placement_is_stable_per_user():
+    settings = _settings(namespace_mode="shared", shared_namespace_count=4)
+
+    first = _server_placement("alice", "a" * 40, settings)
+    second = _server_placement("alice", "b" * 40, settings)
+
+    assert first.shared
+    assert first.namespace == second.namespace
+    assert first.namespace in {f"rexec-server-shared-{shard}" for shard in range(4)}
+    assert first.deployment_name == f"rexec-server-{first.user_key[:10]}-{'a' * 10}"
+    assert first.deployment_name != second.deployment_name
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [{"namespace_mode": "cluster"}, {"namespace_mode": "shared", "shared_namespace_count": 0}],
+)
+def test_placement_rejects_invalid_settings(overrides):
+    with pytest.raises(RexecConfigurationError):
+        _server_placement("alice", "d" * 40, _settings(**overrides))
+
+
+def test_shared_deployments_only_select_their_own_pods():
+    settings = _settings(namespace_mode="shared")
+    placement = _server_placement("alice", "d" * 40, settings)
+
+    manifest = _prepare(settings, user_id="alice")
+
+    selector = manifest["spec"]["selector"]["matchLabels"]
+    template_labels = manifest["spec"]["template"]["metadata"]["labels"]
+    assert manifest["metadata"]["name"] == placement.deployment_name
+    assert selector["rexec-instance"] == placement.deployment_name
+    assert all(template_labels[key] == value for key, value in selector.items())
+
+
+def test_per_user_deployments_keep_the_manifest_selector():
+    manifest = _prepare(_settings())
+
+    assert "rexec-instance" not in manifest["spec"]["selector"]["matchLabels"]
+    assert "rexec-instance" not in manifest["spec"]["template"]["metadata"]["labels"]
+
+
+def test_deleted_shard_namespace_is_created_again(monkeypatch):
+    settings = _settings(namespace_mode="shared")
+    placement = _server_placement("alice", "d" * 40, settings)
+
+    def missing_namespace(**kwargs):
+        raise k8s_exceptions.ApiException(status=404)
+
+    clients = SimpleNamespace(
+        core_v1=SimpleNamespace(read_namespace=lambda name: None),
+        networking_v1=SimpleNamespace(create_namespaced_network_policy=lambda **kwargs: None),
+        apps_v1=SimpleNamespace(
+            list_namespaced_deployment=lambda **kwargs: SimpleNamespace(items=[]),
+            create_namespaced_deployment=missing_namespace,
+        ),
+    )
+    monkeypatch.setattr(create_module, "_resolve_kubeconfig_path", lambda settings: None)
+    monkeypatch.setattr(
+        create_module, "_load_kubernetes_clients", lambda path, **kwargs: clients
+    )
+    monkeypatch.setattr(create_module, "_get_cluster_ip", lambda *args: "10.0.0.1")
+    monkeypatch.setattr(create_module, "_ready_shared_namespaces", {placement.namespace})
+
+    with pytest.raises(RexecDeploymentError):
+        create_module._provision_rexec_server(
+            settings, "alice", placement, "d" * 40, "3.11", [], [], None, None
+        )
+
+    assert placement.namespace not in create_module._ready_shared_namespaces
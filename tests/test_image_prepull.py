@@ -0,0 +1,63 @@
+import logging
+
+import pytest
+
+from api.config.rexec_settings import RexecSettings
+from api.services.rexec_services.create_rexec_server_resources import (
+    RexecValidationError,
+    _image_pull_policy,
+    _validate_python_version,
+)
+from api.services.rexec_services.image_prepull import _prepare_prepull_manifest
+
+
+def test_prepull_manifest_has_one_init_container_per_version():
+    settings = RexecSettings(
+        supported_python_versions="3.11, 3.12",
+        image_prepull_namespace="prepull",
+    )
+    manifest = {
+        "kind": "DaemonSet",
+        "metadata": {"name": "rexec-image-prepull"},
+        "spec": {"template": {"spec": {"initContainers": [{"name": "stale"}]}}},
+    }
+
+    prepared = _prepare_prepull_manifest(manifest, settings)
+
+    assert prepared["metadata"]["namespace"] == "prepull"
+    init_containers = prepared["spec"]["template"]["spec"]["initContainers"]
+    assert [(c["name"], c["image"]) for c in init_containers] == [
+        ("prepull-python-3-11", "python:3.11"),
+        ("prepull-python-3-12", "python:3.12"),
+    ]
+    # The loaded manifest is left untouched
+    assert manifest["spec"]["template"]["spec"]["initContainers"] == [{"name": "stale"}]
+
+
+def test_pull_policy_uses_node_cache_only_for_prepulled_versions():
+    settings = RexecSettings(supported_python_versions="3.11")
+
+    assert _image_pull_policy("3.11", settings) == "IfNotPresent"
+    assert _image_pull_policy("3.9", settings) == "Always"
+    disabled = RexecSettings(supported_python_versions="3.11", image_prepull_enabled=False)
+    assert _image_pull_policy("3.11", disabled) == "Always"
+
+
+def test_unsupported_python_versions_are_rejected():
+    settings = RexecSettings(supported_python_versions="3.11,3.12")
+
+    _validate_python_version("3.12", settings)
+    with pytest.raises(RexecValidationError, match="3.9"):
+        _validate_python_version("3.9", settings)
+
+
+def test_unsupported_python_versions_warn_when_not_rejected(caplog):
+    settings = RexecSettings(
+        supported_python_versions="3.11",
+        reject_unsupported_python_versions=False,
+    )
+
+    with caplog.at_level(logging.WARNING):
+        _validate_python_version("3.9", settings)
+
+    assert "not supported" in caplog.text
@@ -0,0 +1,133 @@
+import threading
+from types import SimpleNamespace
+
+from kubernetes.client import exceptions as k8s_exceptions
+
+from api.config.rexec_settings import RexecSettings
+from api.services.rexec_services import leader_election
+from api.services.rexec_services.leader_election import LeaderElector
+
+
+class FakeCoordinationApi:
+    """In-memory Lease API with resourceVersion conflict checks."""
+
+    def __init__(self):
+        self.lease = None
+        self.version = 0
+
+    def _store(self, lease):
+        self.version += 1
+        lease.metadata.resource_version = str(self.version)
+        self.lease = lease
+        return lease
+
+    def read_namespaced_lease(self, name, namespace):
+        if self.lease is None:
+            raise k8s_exceptions.ApiException(status=404)
+        return self.lease
+
+    def create_namespaced_lease(self, namespace, lease):
+        if self.lease is not None:
+            raise k8s_exceptions.ApiException(status=409)
+        return self._store(lease)
+
+    def replace_namespaced_lease(self, name, namespace, lease):
+        if lease.metadata.resource_version != str(self.version):
+            raise k8s_exceptions.ApiException(status=409)
+        return self._store(lease)
+
+
+def _elector(identity):
+    elector = LeaderElector(
+        RexecSettings(leader_election_lease_duration_seconds=15),
+        threading.Event(),
+        lambda: None,
+        lambda: None,
+    )
+    elector.identity = identity
+    return elector
+
+
+def test_only_one_candidate_holds_the_lease(monkeypatch):
+    api = FakeCoordinationApi()
+    clients = SimpleNamespace(coordination_v1=api)
+    first, second = _elector("worker-1"), _elector("worker-2")
+
+    assert first._try_acquire_or_renew(clients)
+    assert not second._try_acquire_or_renew(clients)
+    assert first._try_acquire_or_renew(clients)
+    assert not second._try_acquire_or_renew(clients)
+
+    # The holder stops renewing; the lease expires on the other's clock
+    now = leader_election.time.monotonic()
+    monkeypatch.setattr(leader_election.time, "monotonic", lambda: now + 16)
+    assert second._try_acquire_or_renew(clients)
+    assert api.lease.spec.holder_identity == "worker-2"
+    assert api.lease.spec.lease_transitions == 1
+
+
+def test_released_lease_is_taken_over_at_once():
+    api = FakeCoordinationApi()
+    clients = SimpleNamespace(coordination_v1=api)
+    first, second = _elector("worker-1"), _elector("worker-2")
+    assert first._try_acquire_or_renew(clients)
+    assert not second._try_acquire_or_renew(clients)
+
+    first._release(clients)
+
+    assert second._try_acquire_or_renew(clients)
+
+
+def test_lease_name_defaults_to_the_host(monkeypatch):
+    monkeypatch.setattr(leader_election.socket, "gethostname", lambda: "Rexec_API.pod-1")
+
+    assert _elector("worker-1").lease_name == "rexec-api-leader-rexec-api-pod-1"
+
+
+def test_in_cluster_lease_is_owned_by_the_pod(tmp_path, monkeypatch):
+    namespace_file = tmp_path / "namespace"
+    namespace_file.write_text("rexec-api\n")
+    monkeypatch.setattr(leader_election, "POD_NAMESPACE_PATH", namespace_file)
+    monkeypatch.setattr(leader_election.socket, "gethostname", lambda: "rexec-api-7d9f")
+    api = FakeCoordinationApi()
+    read_pods = []
+
+    def read_namespaced_pod(name, namespace):
+        read_pods.append((name, namespace))
+        return SimpleNamespace(metadata=SimpleNamespace(name=name, uid="pod-uid"))
+
+    clients = SimpleNamespace(
+        coordination_v1=api,
+        core_v1=SimpleNamespace(read_namespaced_pod=read_namespaced_pod),
+    )
+    elector = LeaderElector(
+        RexecSettings(use_in_cluster_config=True, leader_election_namespace="rexec-api"),
+        threading.Event(),
+        lambda: None,
+        lambda: None,
+    )
+
+    assert elector._try_acquire_or_renew(clients)
+    elector._release(clients)
+    api.lease = None
+    assert elector._try_acquire_or_renew(clients)
+
+    (owner,) = api.lease.metadata.owner_references
+    assert (owner.kind, owner.name, owner.uid) == ("Pod", "rexec-api-7d9f", "pod-uid")
+    assert read_pods == [("rexec-api-7d9f", "rexec-api")]
+
+
+def test_lease_outside_the_pod_namespace_has_no_owner(tmp_path, monkeypatch):
+    namespace_file = tmp_path / "namespace"
+    namespace_file.write_text("rexec-api")
+    monkeypatch.setattr(leader_election, "POD_NAMESPACE_PATH", namespace_file)
+    api = FakeCoordinationApi()
+    elector = LeaderElector(
+        RexecSettings(use_in_cluster_config=True, leader_election_namespace="default"),
+        threading.Event(),
+        lambda: None,
+        lambda: None,
+    )
+
+    assert elector._try_acquire_or_renew(SimpleNamespace(coordination_v1=api))
+    assert api.lease.metadata.owner_references is None
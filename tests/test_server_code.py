@@ -0,0 +1,58 @@
+import importlib
+
+import pytest
+
+from api.config.rexec_settings import RexecSettings
+from api.services.rexec_services.create_rexec_server_resources import (
+    RexecConfigurationError,
+    _build_server_code_artifact,
+    check_server_code,
+)
+
+# The package re-exports a function under the module's name
+resources = importlib.import_module(
+    "api.services.rexec_services.create_rexec_server_resources"
+)
+
+
+def test_git_source_requires_a_pinned_version():
+    with pytest.raises(RexecConfigurationError, match="REXEC_SERVER_CODE_VERSION"):
+        check_server_code(settings=RexecSettings(server_code_source="git"))
+
+    check_server_code(
+        settings=RexecSettings(server_code_source="git", server_code_version="v1.0.0")
+    )
+
+
+def test_configmap_source_rejects_a_version(tmp_path):
+    (tmp_path / "run_server.py").write_text("print('hi')\n")
+    settings = RexecSettings(
+        server_code_source="configmap",
+        server_code_path=str(tmp_path),
+        server_code_version="v1.0.0",
+    )
+
+    with pytest.raises(RexecConfigurationError, match="only applies"):
+        check_server_code(settings=settings)
+
+
+def test_configmap_artifact_is_named_by_content(tmp_path):
+    (tmp_path / "run_server.py").write_text("print('hi')\n")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "data.bin").write_bytes(b"\xff\xfe")
+
+    artifact = _build_server_code_artifact(str(tmp_path))
+
+    assert artifact.name == f"rexec-server-code-{artifact.version}"
+    assert {item["path"] for item in artifact.items} == {"run_server.py", "pkg/data.bin"}
+    assert "pkg_data.bin" in artifact.binary_data
+
+
+def test_configmap_size_counts_base64_encoding(tmp_path, monkeypatch):
+    (tmp_path / "run_server.py").write_text("")
+    # 900 raw bytes fit the limit, but not once base64-encoded
+    (tmp_path / "blob.bin").write_bytes(b"\xff" * 900)
+    monkeypatch.setattr(resources, "SERVER_CODE_MAX_BYTES", 1000)
+
+    with pytest.raises(RexecConfigurationError, match="size limit"):
+        _build_server_code_artifact(str(tmp_path))
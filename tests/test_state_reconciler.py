@@ -0,0 +1,89 @@
+import sqlite3
+from types import SimpleNamespace
+
+from api.config.rexec_settings import RexecSettings
+from api.services.rexec_services import state_reconciler
+from api.services.rexec_services.state_store import (
+    PHASE_PROVISIONING,
+    PHASE_RUNNING,
+    get_state_store,
+)
+
+
+def test_resume_skips_records_owned_by_running_workers(tmp_path, monkeypatch):
+    settings = RexecSettings(state_store_path=str(tmp_path / "state.sqlite3"))
+    store = get_state_store(settings)
+    for digest in ("live", "orphaned"):
+        store.record(
+            user_id="user-1",
+            digest=digest,
+            namespace="rexec-server-user-1",
+            group_id="group",
+            python_version="3.11",
+            requirements=["python==3.11", digest],
+            phase=PHASE_PROVISIONING,
+        )
+    # Records written before owners were tracked, or by an exited process
+    with sqlite3.connect(store.path) as connection:
+        connection.execute("UPDATE rexec_servers SET owner = NULL WHERE digest = 'orphaned'")
+
+    resumed = []
+    monkeypatch.setattr(
+        state_reconciler,
+        "create_rexec_server_resources",
+        lambda group_id, user_id, requirements, settings: resumed.append(requirements),
+    )
+
+    assert state_reconciler.resume_interrupted_provisioning(settings=settings) == 1
+    assert resumed == [["python==3.11", "orphaned"]]
+
+
+def _deployment(namespace, digest, user_id):
+    return SimpleNamespace(
+        metadata=SimpleNamespace(namespace=namespace, labels={"digest": digest}),
+        spec=SimpleNamespace(
+            template=SimpleNamespace(
+                spec=SimpleNamespace(
+                    containers=[
+                        SimpleNamespace(
+                            name="rexec-server",
+                            image="python:3.11",
+                            env=[SimpleNamespace(name="REXEC_USER_ID", value=user_id)],
+                        )
+                    ]
+                )
+            )
+        ),
+        status=SimpleNamespace(available_replicas=1),
+    )
+
+
+def test_reconcile_reapplies_the_policy_of_shard_namespaces(tmp_path, monkeypatch):
+    settings = RexecSettings(state_store_path=str(tmp_path / "state.sqlite3"))
+    deployments = [
+        _deployment("rexec-server-shared-1", "one", "alice"),
+        _deployment("rexec-server-shared-1", "two", "bob"),
+        _deployment("rexec-server-carol", "three", "carol"),
+    ]
+    applied = []
+    clients = SimpleNamespace(
+        apps_v1=SimpleNamespace(
+            list_deployment_for_all_namespaces=lambda **kwargs: SimpleNamespace(
+                items=deployments
+            )
+        ),
+        networking_v1=SimpleNamespace(
+            create_namespaced_network_policy=lambda namespace, body: applied.append(
+                (namespace, body["metadata"]["name"])
+            )
+        ),
+    )
+    monkeypatch.setattr(state_reconciler, "_resolve_kubeconfig_path", lambda settings: None)
+    monkeypatch.setattr(
+        state_reconciler, "_load_kubernetes_clients", lambda path, **kwargs: clients
+    )
+
+    state_reconciler.reconcile_state(settings=settings)
+
+    assert applied == [("rexec-server-shared-1", "rexec-server-isolation")]
+    assert get_state_store(settings).get("carol", "three").phase == PHASE_RUNNING
@@ -0,0 +1,156 @@
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from api.services.rexec_services import state_store
+from api.services.rexec_services.state_store import (
+    PHASE_CREATED,
+    PHASE_FAILED,
+    PHASE_PROVISIONING,
+    ProvisioningStateStore,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProvisioningStateStore(str(tmp_path / "state.sqlite3"))
+
+
+def _record(store, phase=PHASE_PROVISIONING, **overrides):
+    values = {
+        "user_id": "user-1",
+        "digest": "abc123",
+        "namespace": "rexec-server-user-1",
+        "group_id": "group",
+        "python_version": "3.11",
+        "requirements": ["python==3.11", "numpy"],
+        "phase": phase,
+    }
+    values.update(overrides)
+    store.record(**values)
+
+
+def test_record_inserts_and_reads_back(store):
+    _record(store)
+
+    record = store.get("user-1", "abc123")
+    assert record.phase == PHASE_PROVISIONING
+    assert record.requirements == ["python==3.11", "numpy"]
+    assert record.failure_log is None
+
+
+def test_record_upserts_existing_record(store):
+    _record(store)
+    created_at = store.get("user-1", "abc123").created_at
+    store.set_phase("user-1", "abc123", PHASE_FAILED, "boom", "traceback")
+
+    _record(store, phase=PHASE_CREATED, namespace="rexec-shared-1")
+
+    record = store.get("user-1", "abc123")
+    assert record.phase == PHASE_CREATED
+    assert record.namespace == "rexec-shared-1"
+    assert record.message is None
+    assert record.failure_log is None
+    assert record.created_at == created_at
+    assert len(store.list_for_user("user-1")) == 1
+
+
+def test_set_phase_records_failure_details(store):
+    _record(store)
+
+    store.set_phase("user-1", "abc123", PHASE_FAILED, "boom", "last lines")
+
+    record = store.get("user-1", "abc123")
+    assert (record.phase, record.message, record.failure_log) == (
+        PHASE_FAILED,
+        "boom",
+        "last lines",
+    )
+
+
+def test_list_by_phase_filters_phases(store):
+    _record(store, digest="one")
+    _record(store, digest="two", phase=PHASE_CREATED)
+
+    assert [r.digest for r in store.list_by_phase([PHASE_PROVISIONING])] == ["one"]
+    assert store.list_by_phase([]) == []
+
+
+def test_migrates_databases_from_before_added_columns(tmp_path):
+    path = tmp_path / "state.sqlite3"
+    connection = sqlite3.connect(path)
+    connection.execute(
+        """
+        CREATE TABLE rexec_servers (
+            user_id TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            namespace TEXT NOT NULL,
+            group_id TEXT,
+            python_version TEXT NOT NULL,
+            requirements TEXT NOT NULL,
+            phase TEXT NOT NULL,
+            message TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (user_id, digest)
+        )
+        """
+    )
+    connection.execute(
+        "INSERT INTO rexec_servers VALUES "
+        "('user-1', 'abc123', 'ns', NULL, '3.11', '[]', 'Created', NULL, 1, 1)"
+    )
+    connection.commit()
+    connection.close()
+
+    store = ProvisioningStateStore(str(path))
+
+    record = store.get("user-1", "abc123")
+    assert record.phase == PHASE_CREATED
+    assert record.failure_log is None
+    store.set_phase("user-1", "abc123", PHASE_FAILED, "boom", "log")
+    assert store.get("user-1", "abc123").failure_log == "log"
+
+
+def test_failed_resolutions_expire(store, monkeypatch):
+    store.record_resolution("ok", "3.11", ["numpy==2.0.0"], None)
+    store.record_resolution("bad", "3.11", None, "ResolutionImpossible")
+
+    assert store.get_resolution("bad", max_failure_age_seconds=60).error == (
+        "ResolutionImpossible"
+    )
+
+    later = time.time() + 120
+    monkeypatch.setattr(state_store.time, "time", lambda: later)
+    assert store.get_resolution("bad", max_failure_age_seconds=60) is None
+    assert store.get_resolution("ok", max_failure_age_seconds=60).lock == ["numpy==2.0.0"]
+
+
+def test_owner_alive_tracks_the_writing_process(store, tmp_path):
+    _record(store)
+    assert store.owner_alive(store.get("user-1", "abc123").owner)
+
+    # A process that exits releases its lock on the owner file
+    child = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; "
+            "from api.services.rexec_services.state_store import ProvisioningStateStore; "
+            "print(ProvisioningStateStore(sys.argv[1]).owner)",
+            store.path,
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parents[1],
+    )
+    dead_owner = child.stdout.strip()
+
+    assert not store.owner_alive(dead_owner)
+    assert not (Path(f"{store.path}.owners") / f"{dead_owner}.lock").exists()
+    assert not store.owner_alive(None)
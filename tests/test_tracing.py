@@ -0,0 +1,29 @@
+from api.services.tracing import JsonlSpanExporter, Trace
+
+
+def test_jsonl_exporter_rolls_over_past_max_bytes(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = JsonlSpanExporter(str(path), max_bytes=200)
+    trace = Trace("POST /spawn", {})
+    trace.root.finish()
+
+    for _ in range(5):
+        exporter.export(trace)
+
+    assert (tmp_path / "traces.jsonl.1").exists()
+    assert path.stat().st_size < 400
+    assert not (tmp_path / "traces.jsonl.2").exists()
+
+
+def test_server_timing_sums_phases():
+    trace = Trace("POST /spawn", {})
+    for _ in range(2):
+        span = trace.start_span("k8s.apply", trace.root, {})
+        span.finish()
+    trace.root.finish()
+
+    header = trace.server_timing()
+
+    assert header.startswith("k8s.apply;dur=")
+    assert header.count("k8s.apply") == 1
+    assert "total;dur=" in header